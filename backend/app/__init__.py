@@ -2,10 +2,12 @@ from flask import Flask
 from .config import config
 from .db.models import db
 from .controllers import main as main_blueprint
+from .json_provider import DecimalJSONProvider
 from flask_cors import CORS
 
 def create_app(config_name):
     app = Flask(__name__)
+    app.json = DecimalJSONProvider(app)
     app.config.from_object(config[config_name])
     config[config_name].init_app(app)
 
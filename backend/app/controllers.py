@@ -1,19 +1,141 @@
-from flask import Blueprint, jsonify
-from .services import get_all_proposals, get_proposal_details , get_foundational_data
+import hashlib
+from functools import wraps
+from flask import Blueprint, Response, jsonify, request, make_response, stream_with_context
+from werkzeug.http import is_resource_modified
+from .services import (
+    get_proposals_page, get_proposal_details , get_foundational_data, DEFAULT_PROPOSAL_SORT,
+    get_proposals_version, get_proposal_version, get_foundational_data_version,
+    iter_proposals_export, get_tvl_trends, get_tvl_trends_version, get_voting_power,
+)
 
 main = Blueprint('main', __name__)
 
+
+def conditional_get(version_func):
+    """
+    Validator layer for polled endpoints. `version_func` receives the view's
+    arguments and returns a cheap version token (optionally paired with a
+    last-modified datetime), or None when no validator is available. The ETag
+    combines that token with the query string, and a matching If-None-Match /
+    If-Modified-Since short-circuits to 304 before the view runs.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                version = version_func(*args, **kwargs)
+            except Exception:
+                import traceback
+                traceback.print_exc()
+                version = None
+            if version is None:
+                return view(*args, **kwargs)
+
+            last_modified = None
+            if isinstance(version, tuple):
+                version, last_modified = version
+            etag = hashlib.sha1(f"{version}|{request.full_path}".encode()).hexdigest()
+
+            if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+MAX_TVL_HORIZONS = 8
+MAX_TVL_HORIZON_DAYS = 3650
+
+
+def _optional_int_arg(name: str):
+    value = request.args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an integer")
+
+
+def _extract_list_params():
+    """
+    Cursor-based counterpart of DataProcessor.extract_pagination_params:
+    same per_page clamping, but a keyset cursor instead of a page number.
+    """
+    per_page = _optional_int_arg('per_page') or DEFAULT_PER_PAGE
+    per_page = min(max(1, per_page), MAX_PER_PAGE)
+
+    states = [s.strip() for s in request.args.get('state', '').split(',') if s.strip()]
+
+    return {
+        'per_page': per_page,
+        'cursor': request.args.get('cursor') or None,
+        'states': states or None,
+        'created_after': _optional_int_arg('created_after'),
+        'created_before': _optional_int_arg('created_before'),
+        'sort': request.args.get('sort') or DEFAULT_PROPOSAL_SORT,
+        'min_turnout': _optional_int_arg('min_turnout'),
+    }
+
+
+def _extract_tvl_horizons():
+    """Parses ?horizons=7,30,90 into a list of day counts, or None for the defaults."""
+    raw = [h.strip() for h in request.args.get('horizons', '').split(',') if h.strip()]
+    if not raw:
+        return None
+    try:
+        horizons = [int(h) for h in raw]
+    except ValueError:
+        raise ValueError("'horizons' must be a comma-separated list of day counts")
+    if len(horizons) > MAX_TVL_HORIZONS:
+        raise ValueError(f"At most {MAX_TVL_HORIZONS} horizons may be requested")
+    if any(h < 1 or h > MAX_TVL_HORIZON_DAYS for h in horizons):
+        raise ValueError(f"Horizons must be between 1 and {MAX_TVL_HORIZON_DAYS} days")
+    return horizons
+
+
 @main.route('/api/proposals', methods=['GET'])
+@conditional_get(lambda: get_proposals_version())
 def fetch_proposals():
     try:
-        proposals_data = get_all_proposals()
-        return jsonify(proposals_data)
+        params = _extract_list_params()
+        proposals_page = get_proposals_page(**params)
+        return jsonify(proposals_page)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({'error': 'An internal server error occurred'}), 500
 
+@main.route('/api/proposals/export', methods=['GET'])
+def export_proposals():
+    try:
+        params = _extract_list_params()
+        fmt = request.args.get('format', 'ndjson')
+        chunks = iter_proposals_export(
+            fmt,
+            states=params['states'],
+            created_after=params['created_after'],
+            created_before=params['created_before'],
+            min_turnout=params['min_turnout'],
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'application/json'
+    return Response(stream_with_context(chunks), mimetype=mimetype)
+
 @main.route('/api/proposals/<string:proposal_id>', methods=['GET'])
+@conditional_get(lambda proposal_id: get_proposal_version(proposal_id))
 def fetch_proposal(proposal_id):
     try:
         proposal_data = get_proposal_details(proposal_id)
@@ -28,9 +150,45 @@ def fetch_proposal(proposal_id):
 
 
 @main.route('/api/dao-metrics', methods=['GET'])
+@conditional_get(lambda: get_foundational_data_version())
 def fetch_foundational():
     try:
         foundational_data=get_foundational_data()
         return jsonify(foundational_data)
     except Exception as e:
         return jsonify({'error': 'An internal server error occurred'}), 500
+
+
+@main.route('/api/dao-metrics/tvl', methods=['GET'])
+@conditional_get(lambda: get_tvl_trends_version())
+def fetch_tvl_trends():
+    try:
+        horizons = _extract_tvl_horizons()
+        trends = get_tvl_trends(horizons)
+        if 'error' in trends:
+            return jsonify({'error': trends['error']}), trends.get('status', 500)
+        return jsonify(trends)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': 'An internal server error occurred'}), 500
+
+
+@main.route('/api/dao-metrics/voting-power', methods=['GET'])
+def fetch_voting_power():
+    try:
+        block_number = _optional_int_arg('block')
+        if block_number is not None and block_number < 0:
+            raise ValueError("'block' must be a non-negative block number")
+        voting_power = get_voting_power(block_number)
+        if 'error' in voting_power:
+            return jsonify({'error': voting_power['error']}), voting_power.get('status', 500)
+        return jsonify(voting_power)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': 'An internal server error occurred'}), 500
@@ -0,0 +1,20 @@
+from sqlalchemy import func
+
+from .models import db
+
+
+def numeric_sum(column):
+    """Sum of a Numeric column; SQLite's integer sum overflows on token amounts, so it sums floats."""
+    if db.engine.dialect.name == 'postgresql':
+        return func.sum(column)
+    return func.total(column)
+
+
+def text_checksum(column):
+    """
+    Aggregate content signal for a text column. Postgres (where the sink
+    writes) sums a hash of every value; other backends fall back to lengths.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        return func.sum(func.hashtext(column))
+    return func.sum(func.length(column))
@@ -1,6 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import Column, String, Text, BigInteger, Numeric, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Text, BigInteger, Numeric, ForeignKey, func, literal, select
+from sqlalchemy.orm import relationship, query_expression, aliased
 from sqlalchemy.ext.hybrid import hybrid_property
 
 db = SQLAlchemy()
@@ -26,6 +26,12 @@ class Proposal(db.Model):
                (self.against_delegate_votes or 0) + \
                (self.abstain_delegate_votes or 0)
 
+    @total_delegate_votes.expression
+    def total_delegate_votes(cls):
+        return func.coalesce(cls.for_delegate_votes, 0) + \
+               func.coalesce(cls.against_delegate_votes, 0) + \
+               func.coalesce(cls.abstain_delegate_votes, 0)
+
 class Vote(db.Model):
     __tablename__ = 'vote'
     id = Column(String(255), primary_key=True)
@@ -44,14 +50,32 @@ class Proposer(db.Model):
     delegated_votes_raw = Column(Numeric)
     proposals = relationship("Proposal", back_populates="proposer")
 
+    # Populated by queries that pre-aggregate the proposal count with
+    # with_expression(); left as None when the proposer is loaded plainly.
+    proposal_count = query_expression()
+
     @hybrid_property
     def number_votes(self):
+        if self.proposal_count is not None:
+            return self.proposal_count
         return len(self.proposals)
 
+    @number_votes.expression
+    def number_votes(cls):
+        counted = aliased(Proposal)
+        return select(func.count(counted.id)) \
+            .where(counted.proposer_id == cls.id) \
+            .correlate_except(counted) \
+            .scalar_subquery()
+
     @hybrid_property
     def token_holders_represented_amount(self):
         return 0
 
+    @token_holders_represented_amount.expression
+    def token_holders_represented_amount(cls):
+        return literal(0)
+
 class Voter(db.Model):
     __tablename__ = 'voter'
     id = Column(String(42), primary_key=True)
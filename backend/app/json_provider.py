@@ -0,0 +1,17 @@
+from decimal import Decimal
+from flask.json.provider import DefaultJSONProvider
+
+
+class DecimalJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that encodes the Decimal values SQLAlchemy returns for
+    Numeric columns. Integral values (vote tallies, raw token amounts) are
+    written as exact JSON integers, whatever their size; anything else falls
+    back to a float, matching what the pydantic schemas would produce.
+    """
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, Decimal):
+            return int(o) if o == o.to_integral_value() else float(o)
+        return DefaultJSONProvider.default(o)
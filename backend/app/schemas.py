@@ -11,6 +11,7 @@ class CamelCaseModel(BaseModel):
         orm_mode = True
         alias_generator = to_camel
         allow_population_by_field_name = True
+        populate_by_name = True
 
 class VoteSchema(CamelCaseModel):
     id: str
@@ -29,19 +30,22 @@ class ProposerSchema(CamelCaseModel):
     number_votes: Optional[int] = None
     token_holders_represented_amount: Optional[int] = None
 
-class ProposalSchema(CamelCaseModel):
+class ProposalSummarySchema(CamelCaseModel):
+    """List shape of a proposal: everything but the individual votes."""
     id: str
     description: Optional[str]
     proposer: ProposerSchema
     state: str
     creation_time: Optional[int] = None
-    votes: List[VoteSchema] = []
     abstain_delegate_votes: Optional[int] = None
     against_delegate_votes: Optional[int] = None
     for_delegate_votes: Optional[int] = None
     quorum_votes: Optional[int] = None
     total_delegate_votes: Optional[int] = None
 
+class ProposalSchema(ProposalSummarySchema):
+    votes: List[VoteSchema] = []
+
 class OffChainPostSchema(CamelCaseModel):
     cooked: Optional[str]
     reply_count: Optional[int]
@@ -53,4 +57,4 @@ class ProposalDetailSchema(CamelCaseModel):
     on_chain_data: ProposalSchema
     off_chain_discussion: Optional[List[OffChainPostSchema]] = Field(
         None, description="Discussion from the governance forum"
-    )
\ No newline at end of file
+    )
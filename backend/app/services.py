@@ -1,27 +1,352 @@
-from .db.models import Proposal
+import base64
+import hashlib
+import json
+import time
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from flask import current_app, g
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import selectinload
+
+from .db.aggregates import numeric_sum, text_checksum
+from .db.models import db, Proposal, Proposer, Vote
 from .schemas import ProposalSchema
 from .utils.offchain import offchain_service
+from .utils.forum_sync import forum_mirror
 from .utils.foundation_data.dao_metrics import DaoMetricsUtil
-def get_all_proposals():
-    proposals = Proposal.query.all()
-    result = [ProposalSchema.from_orm(p).dict() for p in proposals]
-    return result
+
+# Proposals without a creation_time sort as if created at the epoch, so the
+# keyset (sort key, id) is always total and cursors never hit a NULL.
+_proposal_sort_key = func.coalesce(Proposal.creation_time, 0)
+
+# sort name -> (SQL sort key, descending?). Every sort is tie-broken by id in
+# the same direction so it can be used as a keyset.
+PROPOSAL_SORTS = {
+    'newest': (_proposal_sort_key, True),
+    'oldest': (_proposal_sort_key, False),
+    'turnout': (Proposal.total_delegate_votes, True),
+}
+DEFAULT_PROPOSAL_SORT = 'newest'
+
+
+def _proposer_loader():
+    """
+    Loads proposers in one SELECT ... IN query per result set, with their
+    proposal counts aggregated in SQL so Proposer.number_votes never has to
+    lazily load the proposer's proposals.
+    """
+    return selectinload(Proposal.proposer).with_expression(
+        Proposer.proposal_count, Proposer.number_votes
+    )
+
+
+def proposal_detail_query():
+    """Proposal query for detail views: proposer and votes eager-loaded."""
+    return Proposal.query.options(_proposer_loader(), selectinload(Proposal.votes))
+
+
+# Column projection behind the list and export shapes. Labels are the
+# ProposalSummarySchema / ProposerSchema field names, so rows map straight to
+# the dicts the schemas would produce without building ORM objects or
+# running pydantic per row.
+_PROPOSAL_SUMMARY_COLUMNS = (
+    Proposal.id.label('id'),
+    Proposal.description.label('description'),
+    Proposal.state.label('state'),
+    Proposal.creation_time.label('creation_time'),
+    Proposal.abstain_delegate_votes.label('abstain_delegate_votes'),
+    Proposal.against_delegate_votes.label('against_delegate_votes'),
+    Proposal.for_delegate_votes.label('for_delegate_votes'),
+    Proposal.quorum_votes.label('quorum_votes'),
+)
+_PROPOSER_SUMMARY_COLUMNS = (
+    Proposer.id.label('proposer__id'),
+    Proposer.delegated_votes_raw.label('proposer__delegated_votes_raw'),
+    Proposer.number_votes.label('proposer__number_votes'),
+    Proposer.token_holders_represented_amount.label('proposer__token_holders_represented_amount'),
+)
+
+
+def proposal_summary_query():
+    """Proposal query for list views: projected columns only, votes untouched."""
+    return db.session.query(*_PROPOSAL_SUMMARY_COLUMNS, *_PROPOSER_SUMMARY_COLUMNS) \
+        .select_from(Proposal) \
+        .outerjoin(Proposer, Proposal.proposer_id == Proposer.id)
+
+
+def serialize_proposal_summary(row) -> Dict[str, Any]:
+    """
+    Maps a proposal_summary_query() row to the ProposalSummarySchema dict shape.
+    Numeric columns stay Decimal; DecimalJSONProvider encodes them.
+    """
+    proposal: Dict[str, Any] = {}
+    proposer: Dict[str, Any] = {}
+    for key, value in row._mapping.items():
+        if key.startswith('proposer__'):
+            proposer[key[len('proposer__'):]] = value
+        else:
+            proposal[key] = value
+    # Summed here, like the Python side of the hybrid, so the value is exact
+    # on every backend.
+    proposal['total_delegate_votes'] = (proposal['for_delegate_votes'] or 0) + \
+        (proposal['against_delegate_votes'] or 0) + \
+        (proposal['abstain_delegate_votes'] or 0)
+    proposal['proposer'] = proposer if proposer['id'] is not None else None
+    return proposal
+
+
+def _sort_value(row, sort: str):
+    if sort == 'turnout':
+        return str(int((row.for_delegate_votes or 0) + (row.against_delegate_votes or 0) + (row.abstain_delegate_votes or 0)))
+    return int(row.creation_time or 0)
+
+
+def encode_proposal_cursor(sort: str, value, proposal_id: str) -> str:
+    payload = json.dumps([sort, value, proposal_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_proposal_cursor(cursor: str, sort: str) -> Tuple[Any, str]:
+    """
+    Inverse of encode_proposal_cursor. Raises ValueError on malformed input or
+    when the cursor was issued for a different sort order.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, value, proposal_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value = Decimal(value) if cursor_sort == 'turnout' else int(value)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if cursor_sort != sort:
+        raise ValueError(f"Cursor was issued for sort '{cursor_sort}', not '{sort}'")
+    return value, str(proposal_id)
+
+
+def _filter_proposals(query, states=None, created_after=None, created_before=None, min_turnout=None):
+    if states:
+        query = query.filter(Proposal.state.in_(states))
+    if created_after is not None:
+        query = query.filter(Proposal.creation_time >= created_after)
+    if created_before is not None:
+        query = query.filter(Proposal.creation_time < created_before)
+    if min_turnout is not None:
+        query = query.filter(Proposal.total_delegate_votes >= Decimal(min_turnout))
+    return query
+
+
+def get_proposals_page(
+    per_page: int,
+    cursor: Optional[str] = None,
+    states: Optional[List[str]] = None,
+    created_after: Optional[int] = None,
+    created_before: Optional[int] = None,
+    sort: str = DEFAULT_PROPOSAL_SORT,
+    min_turnout: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Returns one page of proposals without their votes.
+
+    Pages are addressed by an opaque keyset cursor over (sort key, id), so the
+    cost of a page does not depend on how deep into the list it is. Sorting
+    and the turnout filter run in SQL through the models' hybrid expressions.
+    """
+    if sort not in PROPOSAL_SORTS:
+        raise ValueError(f"'sort' must be one of: {', '.join(PROPOSAL_SORTS)}")
+    sort_key, descending = PROPOSAL_SORTS[sort]
+
+    query = _filter_proposals(proposal_summary_query(), states, created_after, created_before, min_turnout)
+    if cursor:
+        after_value, after_id = decode_proposal_cursor(cursor, sort)
+        keyset = tuple_(sort_key, Proposal.id)
+        boundary = tuple_(after_value, after_id)
+        query = query.filter(keyset < boundary if descending else keyset > boundary)
+
+    if descending:
+        query = query.order_by(sort_key.desc(), Proposal.id.desc())
+    else:
+        query = query.order_by(sort_key.asc(), Proposal.id.asc())
+
+    rows = query.limit(per_page + 1).all()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+
+    next_cursor = None
+    if has_next:
+        last = rows[-1]
+        next_cursor = encode_proposal_cursor(sort, _sort_value(last, sort), last.id)
+
+    return {
+        'data': [serialize_proposal_summary(row) for row in rows],
+        'pagination': {
+            'per_page': per_page,
+            'next_cursor': next_cursor,
+            'has_next': has_next,
+        },
+    }
+
+EXPORT_BATCH_SIZE = 500
+EXPORT_FORMATS = ('ndjson', 'json')
+
+
+def iter_proposals_export(
+    fmt: str = 'ndjson',
+    states: Optional[List[str]] = None,
+    created_after: Optional[int] = None,
+    created_before: Optional[int] = None,
+    min_turnout: Optional[int] = None,
+) -> Iterator[str]:
+    """
+    Yields every matching proposal in list shape, oldest first, as text
+    chunks: one JSON object per line for 'ndjson', or the pieces of a single
+    JSON array for 'json'. Rows are pulled EXPORT_BATCH_SIZE at a time from a
+    server-side cursor, so memory stays flat regardless of table size.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"'format' must be one of: {', '.join(EXPORT_FORMATS)}")
+
+    query = _filter_proposals(proposal_summary_query(), states, created_after, created_before, min_turnout) \
+        .order_by(_proposal_sort_key.asc(), Proposal.id.asc()) \
+        .yield_per(EXPORT_BATCH_SIZE)
+
+    def generate():
+        if fmt == 'json':
+            yield '['
+        for index, row in enumerate(query):
+            line = current_app.json.dumps(serialize_proposal_summary(row))
+            if fmt == 'ndjson':
+                yield line + '\n'
+            else:
+                yield (',' if index else '') + line
+        if fmt == 'json':
+            yield ']'
+
+    return generate()
+
+
+# The detail payload embeds live forum discussion that the database knows
+# nothing about, so detail validators also roll over every this many seconds.
+OFFCHAIN_VERSION_WINDOW_SECONDS = 300
+
+
+def _digest(*row_sets) -> str:
+    digest = hashlib.sha1()
+    for rows in row_sets:
+        for row in rows:
+            digest.update(repr(tuple(row)).encode())
+        digest.update(b'|')
+    return digest.hexdigest()
+
+
+def get_proposals_version() -> str:
+    """
+    Version token for everything the proposal list can return, built from
+    aggregates computed in the database: one row per proposal state (count,
+    newest creation time, tally sums, description and proposer checksums)
+    and one for the proposer balances. Only those few rows are transferred,
+    however large the table grows.
+    """
+    proposal_rows = db.session.query(
+        Proposal.state, func.count(Proposal.id), func.max(Proposal.creation_time),
+        numeric_sum(Proposal.for_delegate_votes), numeric_sum(Proposal.against_delegate_votes),
+        numeric_sum(Proposal.abstain_delegate_votes), numeric_sum(Proposal.quorum_votes),
+        text_checksum(Proposal.description), text_checksum(Proposal.proposer_id),
+    ).group_by(Proposal.state).order_by(Proposal.state)
+    votes = Proposer.delegated_votes_raw
+    proposer_row = db.session.query(
+        func.count(Proposer.id), numeric_sum(votes), numeric_sum(votes * votes), text_checksum(Proposer.id)
+    ).one()
+    return _digest(proposal_rows, [proposer_row])
+
+
+def get_proposal_version(proposal_id: str) -> Optional[str]:
+    """Version token for one proposal's detail payload, or None if it does not exist."""
+    proposal_row = db.session.query(
+        Proposal.id, Proposal.state, Proposal.creation_time, Proposal.proposer_id,
+        Proposal.for_delegate_votes, Proposal.against_delegate_votes,
+        Proposal.abstain_delegate_votes, Proposal.quorum_votes,
+        text_checksum(Proposal.description),
+        Proposer.delegated_votes_raw, Proposer.number_votes,
+    ).outerjoin(Proposal.proposer).filter(Proposal.id == proposal_id) \
+        .group_by(Proposal.id, Proposer.id).first()
+    if proposal_row is None:
+        return None
+    # Aggregates over the proposal's votes, so the token costs one row however many there are.
+    vote_row = db.session.query(
+        func.count(Vote.id), func.max(Vote.id), numeric_sum(Vote.weight),
+        text_checksum(Vote.choice), text_checksum(Vote.reason), text_checksum(Vote.voter_id),
+    ).filter(Vote.proposal_id == proposal_id).one()
+    window = int(time.time() // OFFCHAIN_VERSION_WINDOW_SECONDS)
+    return _digest([proposal_row], [vote_row], [(window,)])
+
+
+def _get_offchain_discussion(description: Optional[str], state: Optional[str], proposal_id: str):
+    """
+    Forum discussion for a proposal, read from the local forum mirror. Topics
+    the sync job has not reached yet fall back to the cached live fetch.
+    """
+    forum_url = offchain_service.resolve_forum_url(description, proposal_id)
+    if not forum_url:
+        return None
+    discussion_posts = forum_mirror.get_posts(forum_url)
+    if discussion_posts is not None:
+        return discussion_posts
+    return offchain_service.get_filtered_discussion(description, state=state, proposal_id=proposal_id)
 
 def get_proposal_details(proposal_id: str):
-    proposal = Proposal.query.get(proposal_id)
+    proposal = proposal_detail_query().filter(Proposal.id == proposal_id).one_or_none()
     if not proposal:
         return None
 
     on_chain_data = ProposalSchema.from_orm(proposal).dict()
-    
-    discussion_posts = None
-    discussion_posts = offchain_service.get_filtered_discussion(on_chain_data["description"])
+
+    discussion_posts = _get_offchain_discussion(on_chain_data["description"], on_chain_data["state"], proposal_id)
 
     return {
         "on_chain_data": on_chain_data,
         "off_chain_discussion": discussion_posts
     }
 
+def _get_delegate_concentration():
+    """Local concentration metrics, or an error payload so the other metrics are still served."""
+    try:
+        # Reuse the data version the validator already read in this request.
+        return DaoMetricsUtil.get_delegate_concentration(data_version=g.get('delegate_concentration_version'))
+    except Exception as e:
+        current_app.logger.warning(f"Delegate concentration unavailable: {e}")
+        return {"error": f"Error computing delegate concentration: {str(e)}", "status": 500}
+
+
+def _get_delegate_concentration_version() -> str:
+    try:
+        version = DaoMetricsUtil.get_delegate_concentration_version()
+    except Exception as e:
+        current_app.logger.warning(f"Delegate concentration version unavailable: {e}")
+        return "unavailable"
+    g.delegate_concentration_version = version
+    return version
+
+
 def get_foundational_data():
     dao_metrics = DaoMetricsUtil.get_all_dao_metrics()
-    return dao_metrics
\ No newline at end of file
+    dao_metrics["delegate_concentration"] = _get_delegate_concentration()
+    return dao_metrics
+
+def get_foundational_data_version():
+    metrics_version = DaoMetricsUtil.get_metrics_version()
+    if metrics_version is None:
+        return None
+    version, last_modified = metrics_version
+    return f"{version}|concentration:{_get_delegate_concentration_version()}", last_modified
+
+
+def get_voting_power(block_number: Optional[int] = None):
+    return DaoMetricsUtil.get_voting_power(block_number)
+
+
+def get_tvl_trends(horizons: Optional[List[int]] = None):
+    return DaoMetricsUtil.get_tvl_trends(horizons)
+
+
+def get_tvl_trends_version():
+    return DaoMetricsUtil.get_tvl_trends_version()
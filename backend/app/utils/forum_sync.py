@@ -0,0 +1,228 @@
+"""
+Local mirror of the governance forum topics linked from proposals.
+
+The sync job polls each linked topic incrementally: the topic JSON is
+revalidated with its ETag, posts with ids above the last one mirrored are
+fetched and stored, and the most recent window of posts is re-fetched so
+edits, reads, scores and reply counts stay current. Detail requests then
+read a topic's posts with a single local query instead of calling the forum.
+
+    cd backend
+    python -m app.utils.forum_sync --once        # one pass over all proposals
+    python -m app.utils.forum_sync --interval 300
+"""
+import argparse
+import os
+import time
+import logging
+import requests
+from typing import Any, Dict, Iterable, List, Optional
+
+from .local_store import LocalStore, local_store
+from .offchain import OffChainDataService, normalize_topic_url, offchain_service
+
+logger = logging.getLogger(__name__)
+
+
+class ForumMirror:
+    """Stores the filtered OffChainPostSchema fields of mirrored forum topics."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS forum_topic (
+        url TEXT PRIMARY KEY,
+        topic_id INTEGER NOT NULL,
+        last_post_id INTEGER NOT NULL DEFAULT 0,
+        etag TEXT,
+        synced_at REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS forum_post (
+        topic_url TEXT NOT NULL,
+        post_id INTEGER NOT NULL,
+        post_number INTEGER,
+        cooked TEXT,
+        reply_count INTEGER,
+        reads INTEGER,
+        score REAL,
+        trust_level INTEGER,
+        PRIMARY KEY (topic_url, post_id)
+    );
+    """
+
+    # Posts stay mutable after they are mirrored (edits, reads, score, replies),
+    # so every sync also re-fetches this many of the topic's latest posts.
+    REFRESH_WINDOW = 50
+
+    def __init__(self, service: OffChainDataService = offchain_service, store: LocalStore = local_store):
+        self.service = service
+        self.store = store
+        self.store.ensure_schema(self.SCHEMA)
+
+    def get_posts(self, url: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Mirrored posts of a topic in thread order, or None if the topic has
+        never been synced.
+        """
+        rows = self.store.fetchall(
+            """
+            SELECT p.post_id, p.cooked, p.reply_count, p.reads, p.score, p.trust_level
+            FROM forum_topic t LEFT JOIN forum_post p ON p.topic_url = t.url
+            WHERE t.url = ?
+            ORDER BY p.post_number, p.post_id
+            """,
+            (normalize_topic_url(url),)
+        )
+        if not rows:
+            return None
+        return [
+            {
+                "cooked": row["cooked"],
+                "reply_count": row["reply_count"],
+                "reads": row["reads"],
+                "score": row["score"],
+                "trust_level": row["trust_level"],
+            }
+            for row in rows if row["post_id"] is not None
+        ]
+
+    def last_synced_at(self, url: str) -> Optional[float]:
+        row = self.store.fetchone("SELECT synced_at FROM forum_topic WHERE url = ?", (normalize_topic_url(url),))
+        return row["synced_at"] if row else None
+
+    @staticmethod
+    def _store_posts(conn, url: str, posts: List[Dict[str, Any]]) -> None:
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO forum_post
+                (topic_url, post_id, post_number, cooked, reply_count, reads, score, trust_level)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (url, p["id"], p.get("post_number"), p.get("cooked"), p.get("reply_count"),
+                 p.get("reads"), p.get("score"), p.get("trust_level"))
+                for p in posts
+            ]
+        )
+
+    def _refresh_recent_posts(self, url: str, topic_id: int) -> None:
+        """Re-fetches the latest mirrored posts of a topic whose JSON has not changed."""
+        rows = self.store.fetchall(
+            "SELECT post_id FROM forum_post WHERE topic_url = ? ORDER BY post_id DESC LIMIT ?",
+            (url, self.REFRESH_WINDOW)
+        )
+        recent_ids = [row["post_id"] for row in reversed(rows)]
+        posts = self.service.fetch_posts_by_id(topic_id, recent_ids) if recent_ids else []
+        with self.store.transaction() as conn:
+            self._store_posts(conn, url, posts)
+            conn.execute("UPDATE forum_topic SET synced_at = ? WHERE url = ?", (time.time(), url))
+
+    def sync_topic(self, url: str) -> int:
+        """
+        Brings one topic up to date and returns the number of new posts stored.
+        Posts in the refresh window are re-fetched and overwritten, and posts
+        no longer in the topic's stream are removed. Raises
+        requests.RequestException if the forum cannot be reached.
+        """
+        url = normalize_topic_url(url)
+        topic = self.store.fetchone("SELECT topic_id, last_post_id, etag FROM forum_topic WHERE url = ?", (url,))
+        last_post_id = topic["last_post_id"] if topic else 0
+
+        result = self.service._fetch_discussion_json(url, etag=topic["etag"] if topic else None, complete=False)
+        if result is None:
+            raise requests.ConnectionError(f"Could not fetch forum topic {url}")
+        if result["not_modified"]:
+            self._refresh_recent_posts(url, topic["topic_id"])
+            return 0
+
+        data = result["data"]
+        post_stream = data.get("post_stream", {})
+        inline_posts = {p["id"]: p for p in post_stream.get("posts", []) if isinstance(p, dict) and "id" in p}
+        stream_ids = post_stream.get("stream") or sorted(inline_posts)
+
+        # New posts, the refresh window and whatever the topic JSON already inlines.
+        wanted = set(stream_ids[-self.REFRESH_WINDOW:]) | set(inline_posts)
+        wanted_ids = [post_id for post_id in stream_ids if post_id > last_post_id or post_id in wanted]
+        missing_ids = [post_id for post_id in wanted_ids if post_id not in inline_posts]
+        fetched = {p["id"]: p for p in self.service.fetch_posts_by_id(data["id"], missing_ids)} if missing_ids else {}
+        posts = [inline_posts.get(post_id) or fetched.get(post_id) for post_id in wanted_ids]
+        posts = [p for p in posts if p is not None]
+        new_post_ids = [p["id"] for p in posts if p["id"] > last_post_id]
+
+        with self.store.transaction() as conn:
+            if post_stream.get("stream"):
+                # Deleted or hidden posts drop out of the stream.
+                in_stream = set(stream_ids)
+                stored_ids = [row[0] for row in conn.execute("SELECT post_id FROM forum_post WHERE topic_url = ?", (url,))]
+                conn.executemany(
+                    "DELETE FROM forum_post WHERE topic_url = ? AND post_id = ?",
+                    [(url, post_id) for post_id in stored_ids if post_id not in in_stream]
+                )
+            self._store_posts(conn, url, posts)
+            conn.execute(
+                """
+                INSERT INTO forum_topic (url, topic_id, last_post_id, etag, synced_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    topic_id = excluded.topic_id, last_post_id = excluded.last_post_id,
+                    etag = excluded.etag, synced_at = excluded.synced_at
+                """,
+                (url, data["id"], max([last_post_id] + new_post_ids), result["etag"], time.time())
+            )
+        return len(new_post_ids)
+
+    def sync_proposals(self, proposals: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Syncs the topics linked from the given proposals ({"id", "description",
+        "state"} dicts). Topics are skipped while they are younger than the
+        state-aware TTL of the off-chain service.
+        """
+        summary = {"synced": 0, "skipped": 0, "failed": 0, "new_posts": 0}
+        seen_urls = set()
+        now = time.time()
+        for proposal in proposals:
+            url = self.service.resolve_forum_url(proposal["description"], proposal["id"])
+            if not url or url in seen_urls:
+                continue
+            seen_urls.add(url)
+
+            synced_at = self.last_synced_at(url)
+            if synced_at is not None and now - synced_at < self.service._ttl_for_state(proposal["state"]):
+                summary["skipped"] += 1
+                continue
+            try:
+                summary["new_posts"] += self.sync_topic(url)
+                summary["synced"] += 1
+            except (requests.RequestException, ValueError, KeyError) as e:
+                logger.warning(f"Forum sync failed for {url}: {e}")
+                summary["failed"] += 1
+        return summary
+
+
+forum_mirror = ForumMirror()
+
+
+def _load_proposals() -> List[Dict[str, Any]]:
+    from ..db.models import Proposal
+    rows = Proposal.query.with_entities(Proposal.id, Proposal.description, Proposal.state).all()
+    return [{"id": r.id, "description": r.description, "state": r.state} for r in rows]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mirror governance forum topics linked from proposals.")
+    parser.add_argument('--once', action='store_true', help='run a single sync pass and exit')
+    parser.add_argument('--interval', type=int, default=300, help='seconds between sync passes')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from app import create_app
+    app = create_app(os.getenv('FLASK_CONFIG') or 'default')
+    while True:
+        with app.app_context():
+            proposals = _load_proposals()
+        summary = forum_mirror.sync_proposals(proposals)
+        logger.info(f"Forum sync pass: {summary}")
+        if args.once:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
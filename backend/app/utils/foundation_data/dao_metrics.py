@@ -1,53 +1,273 @@
+import os
 import json
-from typing import Dict, Any, List
+import time
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, List, Optional, Tuple, Callable
 from datetime import datetime
-from .tvl_slope import llama_tvl_analyzer
+from .tvl_slope import llama_tvl_analyzer, DEFAULT_TREND_HORIZONS
 from .voting_power import subgraph_service
 from .top_delegate import dune_analytics_service
 from .treasury import treasury_analytics_service
+from .delegate_concentration import delegate_concentration_engine, DEFAULT_TOP_N
+
+
+def _value_or_error(result: Dict[str, Any], key: str) -> Any:
+    return result.get(key) if "error" not in result else result
+
+
+def _is_error(value: Any) -> bool:
+    return isinstance(value, dict) and "error" in value
+
+
+def _fetch_treasury() -> Dict[str, Any]:
+    treasury_balance = treasury_analytics_service.get_treasury_balance_usd()
+    treasury_runway = treasury_analytics_service.get_treasury_runway_months()
+    treasury_ratio = treasury_analytics_service.get_treasury_to_expense_ratio()
+    return {
+        "total_usd": _value_or_error(treasury_balance, "total_usd"),
+        "runway_months": _value_or_error(treasury_runway, "runway_months"),
+        "expense_ratio": _value_or_error(treasury_ratio, "current_ratio"),
+    }
+
+
+def _fetch_governance() -> Dict[str, Any]:
+    governance_power = subgraph_service.get_total_voting_power()
+    return {"total_delegated_voting_power": _value_or_error(governance_power, "totalDelegatedVotingPower")}
+
+
+def _fetch_delegates() -> Dict[str, Any]:
+    top_delegate_metric = dune_analytics_service.get_top_delegate_sum_metric()
+    return {"top_3_sum_metric": _value_or_error(top_delegate_metric, "divided_value")}
+
+
+def _fetch_tvl() -> Dict[str, Any]:
+    tvl_slopes = llama_tvl_analyzer.get_weekly_tvl_slopes()
+    return {"average_weekly_slope": _value_or_error(tvl_slopes, "average_weekly_slope_usd_per_day")}
+
+
+# source -> (fetcher, fields it contributes to the combined response)
+SOURCES: Dict[str, Tuple[Callable[[], Dict[str, Any]], List[str]]] = {
+    "treasury": (_fetch_treasury, ["total_usd", "runway_months", "expense_ratio"]),
+    "governance": (_fetch_governance, ["total_delegated_voting_power"]),
+    "delegates": (_fetch_delegates, ["top_3_sum_metric"]),
+    "tvl": (_fetch_tvl, ["average_weekly_slope"]),
+}
+
+
+def _env_seconds(name: str, defaults: Dict[str, float]) -> Dict[str, float]:
+    return {source: float(os.getenv(f"DAO_METRICS_{source.upper()}_{name}", default))
+            for source, default in defaults.items()}
+
+
+def _source_status(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """The "sources" block served for one snapshot entry."""
+    if not entry["stale"]:
+        status = "ok"
+    elif entry["updated_at"] is not None:
+        status = "stale"
+    else:
+        status = "error"
+    updated_at = entry["updated_at"]
+    return {
+        "status": status,
+        "updated_at": updated_at.isoformat() + 'Z' if isinstance(updated_at, datetime) else None,
+        "elapsed_ms": entry["elapsed_ms"],
+    }
+
+
+# Sources keep running past their deadline (so the snapshot still gets
+# filled), which is why the pool is larger than the number of sources.
+_metrics_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="dao-metrics")
+
+
+class MetricsSnapshot:
+    """
+    Last good value of every metrics source, kept warm by a background thread.
+
+    Each source is refreshed on its own period. A failed refresh keeps the
+    previous good value and marks it stale; a source that has never succeeded
+    is retried on the shorter FAILURE_RETRY_SECONDS period.
+    """
+
+    FAILURE_RETRY_SECONDS = 60.0
+    TICK_SECONDS = 1.0
+
+    def __init__(self, refresh_periods: Dict[str, float]):
+        self.refresh_periods = refresh_periods
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+
+    def get(self, source: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(source)
+
+    def refresh_async(self, source: str) -> Future:
+        """Starts a refresh of `source` unless one is already running, and returns its future."""
+        with self._lock:
+            future = self._inflight.get(source)
+            if future is None or future.done():
+                future = _metrics_pool.submit(self._refresh, source)
+                self._inflight[source] = future
+            return future
+
+    def _refresh(self, source: str) -> Dict[str, Any]:
+        fetch, fields = SOURCES[source]
+        started = time.monotonic()
+        try:
+            values = fetch()
+            error = next((values[f]["error"] for f in fields if _is_error(values[f])), None)
+        except Exception as e:
+            error = f"Error fetching {source} metrics: {str(e)}"
+            values = {field: {"error": error, "status": 500} for field in fields}
+        elapsed_ms = round((time.monotonic() - started) * 1000, 1)
+
+        with self._lock:
+            previous = self._entries.get(source)
+            if error is None:
+                entry = {"values": values, "updated_at": datetime.utcnow(), "stale": False, "error": None}
+            elif previous is not None and previous["updated_at"] is not None:
+                entry = {**previous, "stale": True, "error": error}
+            else:
+                entry = {"values": values, "updated_at": None, "stale": True, "error": error}
+            entry["elapsed_ms"] = elapsed_ms
+            entry["checked_at"] = time.monotonic()
+            self._entries[source] = entry
+        return entry
+
+    def _is_due(self, source: str, now: float) -> bool:
+        entry = self._entries.get(source)
+        if entry is None:
+            return True
+        period = self.refresh_periods[source]
+        if entry["updated_at"] is None:
+            period = min(period, self.FAILURE_RETRY_SECONDS)
+        return now - entry["checked_at"] >= period
+
+    def refresh_due(self) -> None:
+        now = time.monotonic()
+        for source in SOURCES:
+            if self._is_due(source, now):
+                self.refresh_async(source)
+
+    def start(self) -> None:
+        """Starts the background refresher in this process if it is not already running."""
+        if self._thread is not None and self._thread.is_alive() and self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._thread_pid == os.getpid():
+                return
+            self._thread = threading.Thread(target=self._run, name="dao-metrics-refresher", daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.refresh_due()
+            except RuntimeError:
+                # The pool is shut down at interpreter exit.
+                return
+            time.sleep(self.TICK_SECONDS)
+
 
 class DaoMetricsUtil:
     """
     A utility class to fetch and organize key DAO metrics from various services.
     """
 
+    SOURCES = SOURCES
+
+    # Seconds a request waits for a source that has no snapshot yet.
+    # Override per source with DAO_METRICS_<SOURCE>_DEADLINE.
+    SOURCE_DEADLINES_SECONDS: Dict[str, float] = _env_seconds(
+        "DEADLINE", {"treasury": 20, "governance": 15, "delegates": 10, "tvl": 15}
+    )
+    # Seconds between background refreshes of each source.
+    # Override per source with DAO_METRICS_<SOURCE>_REFRESH.
+    SOURCE_REFRESH_SECONDS: Dict[str, float] = _env_seconds(
+        "REFRESH", {"treasury": 600, "governance": 300, "delegates": 900, "tvl": 3600}
+    )
+    BACKGROUND_REFRESH: bool = os.getenv("DAO_METRICS_BACKGROUND_REFRESH", "1") != "0"
+
+    snapshot = MetricsSnapshot(SOURCE_REFRESH_SECONDS)
+
     @staticmethod
-    def get_all_dao_metrics() -> Dict[str, Any]:
+    def revalidate() -> MetricsSnapshot:
         """
-        Fetches key summary metrics from all integrated services (Treasury,
-        Governance, Delegates, TVL) and combines them into a single response object.
+        Starts the background refresher (when enabled) and kicks off refreshes
+        of the sources that are due. Returns the snapshot.
         """
-        treasury_balance = treasury_analytics_service.get_treasury_balance_usd()
-        treasury_runway = treasury_analytics_service.get_treasury_runway_months()
-        treasury_ratio = treasury_analytics_service.get_treasury_to_expense_ratio()
-        treasury_full_data = treasury_analytics_service._get_cached_analysis()
-
-        governance_power = subgraph_service.get_total_voting_power()
-        top_delegate_metric = dune_analytics_service.get_top_delegate_sum_metric()
-        tvl_slopes = llama_tvl_analyzer.get_weekly_tvl_slopes()
-
-        last_updated_ts = treasury_full_data.get("_cache_timestamp")
-        last_updated_str = last_updated_ts.isoformat() + 'Z' if isinstance(last_updated_ts, datetime) else None
-
-        results: Dict[str, Any] = {
-            "treasury": {
-                "total_usd": treasury_balance.get("total_usd") if "error" not in treasury_balance else treasury_balance,
-                "runway_months": treasury_runway.get("runway_months") if "error" not in treasury_runway else treasury_runway,
-                "expense_ratio": treasury_ratio.get("current_ratio") if "error" not in treasury_ratio else treasury_ratio,
-            },
-            "governance": {
-                "total_delegated_voting_power": governance_power.get("totalDelegatedVotingPower") if "error" not in governance_power else governance_power,
-            },
-            "delegates": {
-                "top_3_sum_metric": top_delegate_metric.get("divided_value") if "error" not in top_delegate_metric else top_delegate_metric,
-            },
-            "tvl": {
-                "average_weekly_slope": tvl_slopes.get("average_weekly_slope_usd_per_day") if "error" not in tvl_slopes else tvl_slopes,
-            }
-        }
+        snapshot = DaoMetricsUtil.snapshot
+        if DaoMetricsUtil.BACKGROUND_REFRESH:
+            snapshot.start()
+        snapshot.refresh_due()
+        return snapshot
+
+    @staticmethod
+    def get_all_dao_metrics(deadlines: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """
+        Returns key summary metrics from all integrated services (Treasury,
+        Governance, Delegates, TVL) from the in-memory snapshot, which a
+        background thread keeps warm. Sources due for a refresh are revalidated
+        asynchronously while the last good value is served.
 
+        Only a source with no snapshot yet is waited for, concurrently with the
+        others and bounded by its own deadline; one that misses it is reported
+        with a timeout error in its fields. Per-source status, freshness and
+        timing are reported under "sources".
+        """
+        snapshot = DaoMetricsUtil.revalidate()
+
+        deadlines = {**DaoMetricsUtil.SOURCE_DEADLINES_SECONDS, **(deadlines or {})}
+        started = time.monotonic()
+        pending = {source: snapshot.refresh_async(source) for source in SOURCES if snapshot.get(source) is None}
+        for source, future in pending.items():
+            remaining = max(0.0, started + deadlines[source] - time.monotonic())
+            try:
+                future.result(timeout=remaining)
+            except FutureTimeoutError:
+                pass
+
+        results: Dict[str, Any] = {}
+        source_status: Dict[str, Any] = {}
+        for source, (_, fields) in SOURCES.items():
+            entry = snapshot.get(source)
+            if entry is None:
+                error = {"error": f"{source} metrics did not respond within {deadlines[source]:g}s", "status": 504}
+                results[source] = {field: error for field in fields}
+                source_status[source] = {"status": "timeout", "updated_at": None, "elapsed_ms": None}
+                continue
+
+            results[source] = entry["values"]
+            source_status[source] = _source_status(entry)
+
+        results["sources"] = source_status
         return results
 
+    @staticmethod
+    def get_metrics_version() -> Optional[Tuple[str, datetime]]:
+        """
+        Returns a (version, last_modified) pair for the combined metrics once
+        every source has a snapshot, or None while any is still missing.
+
+        Due sources are revalidated first, so clients polling with a validator
+        keep the snapshot refreshing even without the background thread. The
+        version hashes the metric values and each source's status only; the
+        timing fields differ between workers and would split the ETag.
+        """
+        snapshot = DaoMetricsUtil.revalidate()
+        entries = [snapshot.get(source) for source in SOURCES]
+        if any(entry is None for entry in entries):
+            return None
+        served = {source: (entry["values"], _source_status(entry)["status"]) for source, entry in zip(SOURCES, entries)}
+        version = hashlib.sha1(json.dumps(served, sort_keys=True, default=str).encode()).hexdigest()
+        timestamps = [entry["updated_at"] for entry in entries if entry["updated_at"] is not None]
+        return version, max(timestamps) if timestamps else None
+
     @staticmethod
     def get_treasury_data() -> Dict[str, Any]:
         """
@@ -63,12 +283,45 @@ class DaoMetricsUtil:
             "total_delegated_voting_power": subgraph_service.get_total_voting_power(),
         }
 
+    @staticmethod
+    def get_voting_power(block_number: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Total delegated voting power: refreshed to the subgraph's head when no
+        block is given, otherwise read from the block-indexed aggregate as of
+        the latest indexed block at or before `block_number`.
+        """
+        if block_number is None:
+            return subgraph_service.get_total_voting_power()
+        return subgraph_service.get_total_voting_power_at(block_number)
+
     @staticmethod
     def get_top_delegate_metric() -> Dict[str, Any]:
         """Exposes the top 3 delegate sum metric from Dune Analytics."""
         return dune_analytics_service.get_top_delegate_sum_metric()
 
+    @staticmethod
+    def get_delegate_concentration(top_n: Optional[List[int]] = None,
+                                   data_version: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Exposes delegate concentration (top-N share, Gini, Nakamoto coefficient)
+        computed from the local voter table. Needs an application context.
+        """
+        return delegate_concentration_engine.get_concentration(top_n or DEFAULT_TOP_N, data_version)
+
+    @staticmethod
+    def get_delegate_concentration_version() -> str:
+        return delegate_concentration_engine.get_data_version()
+
     @staticmethod
     def get_tvl_metrics() -> Dict[str, Any]:
         """Exposes the TVL slope analysis."""
-        return llama_tvl_analyzer.get_weekly_tvl_slopes()
\ No newline at end of file
+        return llama_tvl_analyzer.get_weekly_tvl_slopes()
+
+    @staticmethod
+    def get_tvl_trends(horizons: Optional[List[int]] = None) -> Dict[str, Any]:
+        """Exposes multi-horizon TVL trends served from the local daily TVL history."""
+        return llama_tvl_analyzer.get_tvl_trends(horizons or DEFAULT_TREND_HORIZONS)
+
+    @staticmethod
+    def get_tvl_trends_version() -> Optional[str]:
+        return llama_tvl_analyzer.get_tvl_trends_version()
\ No newline at end of file
@@ -0,0 +1,94 @@
+import threading
+import numpy as np
+from typing import Dict, Any, Optional, Sequence, Tuple
+from sqlalchemy import func
+from ...db.aggregates import numeric_sum
+from ...db.models import db, Voter
+
+
+DEFAULT_TOP_N: Tuple[int, ...] = (3, 10, 100)
+
+
+def concentration_metrics(votes: np.ndarray, top_n: Sequence[int] = DEFAULT_TOP_N) -> Dict[str, Any]:
+    """
+    Concentration of a voting power distribution given its positive
+    balances sorted from largest to smallest: share of the top N, Gini
+    coefficient and Nakamoto coefficient (the fewest delegates holding a
+    majority).
+    """
+    count = len(votes)
+    total = float(votes.sum()) if count else 0.0
+    if total <= 0:
+        return {"delegates": 0, "total_voting_power": 0.0, "gini": None, "nakamoto_coefficient": None,
+                "top_n_share_pct": {str(n): None for n in top_n}}
+
+    cumulative_share = np.cumsum(votes) / total
+    # Gini over the ascending order: (2 * sum(i * x_i)) / (n * sum(x)) - (n + 1) / n, i from 1.
+    ascending = votes[::-1]
+    ranks = np.arange(1, count + 1, dtype=np.float64)
+    gini = 2.0 * float(np.dot(ranks, ascending)) / (count * total) - (count + 1) / count
+
+    return {
+        "delegates": count,
+        "total_voting_power": total,
+        "gini": round(gini, 4),
+        "nakamoto_coefficient": int(np.searchsorted(cumulative_share, 0.5, side='right')) + 1,
+        "top_n_share_pct": {str(n): round(float(cumulative_share[min(n, count) - 1]) * 100, 2) for n in top_n},
+    }
+
+
+class DelegateConcentrationEngine:
+    """
+    Delegate concentration computed locally from the voter table. Results are
+    kept for the data version they were computed at (one aggregate query
+    over the table), so repeated reads skip loading and sorting the balances
+    until the sink writes new ones.
+    """
+
+    def __init__(self):
+        self._cached: Dict[Tuple[str, Tuple[int, ...]], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get_data_version(self) -> str:
+        """
+        Version of the balance distribution the metrics depend on. Besides
+        count, sum and max it carries the sums of squares and cubes, which
+        change when votes move between delegates that are already positive.
+        Reshuffles that keep the multiset of balances (e.g. two delegates
+        swapping amounts) keep the version, and leave the metrics unchanged.
+        """
+        votes = Voter.delegated_votes_raw
+        row = db.session.query(
+            func.count(Voter.id), numeric_sum(votes), func.max(votes),
+            numeric_sum(votes * votes), numeric_sum(votes * votes * votes)
+        ).filter(votes > 0).one()
+        return ":".join(str(value) for value in row)
+
+    def _load_votes(self) -> np.ndarray:
+        rows = db.session.query(Voter.delegated_votes_raw) \
+            .filter(Voter.delegated_votes_raw > 0) \
+            .order_by(Voter.delegated_votes_raw.desc())
+        return np.fromiter((float(value) for (value,) in rows), dtype=np.float64)
+
+    def get_concentration(self, top_n: Sequence[int] = DEFAULT_TOP_N,
+                          data_version: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Concentration metrics for the current balances. Pass `data_version`
+        when the caller has just read it (e.g. for an ETag) to skip reading
+        it again.
+        """
+        key = (data_version or self.get_data_version(), tuple(top_n))
+        with self._lock:
+            cached = self._cached.get(key)
+        if cached is not None:
+            return cached
+
+        result = concentration_metrics(self._load_votes(), top_n)
+        with self._lock:
+            # Only the current data version is worth keeping.
+            self._cached = {k: v for k, v in self._cached.items() if k[0] == key[0]}
+            self._cached[key] = result
+        return result
+
+
+delegate_concentration_engine = DelegateConcentrationEngine()
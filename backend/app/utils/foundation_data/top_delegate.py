@@ -2,6 +2,8 @@ import os
 import requests
 from dotenv import load_dotenv
 from typing import Dict, Any, List, Optional
+from ..http_client import http_client
+from ..shared_cache import SharedCache, shared_cache
 
 
 load_dotenv('.env')
@@ -10,13 +12,20 @@ class DuneAnalyticsService:
     """
     Service class to interact with the Dune Analytics API, fetching and 
     processing specific query results.
+
+    The metric is cached across workers together with the execution it was
+    computed from. Within RECHECK_SECONDS nothing is requested; after that
+    the latest execution is checked with a one-value request, and the top
+    rows of the value column are downloaded only when Dune has re-executed
+    the query.
     """
     
     QUERY_ID: str = os.getenv('DUNE_DELEGATES_QUERY_ID', '5858070')
     DUNE_API_URL: str = "https://api.dune.com/api/v1/query/"
-    LIMIT: int = 1000
+    LIMIT: int = 3
+    RECHECK_SECONDS: float = float(os.getenv('DUNE_RECHECK_SECONDS', '300'))
     
-    def __init__(self):
+    def __init__(self, cache: SharedCache = shared_cache):
         
         self.api_key: Optional[str] = os.getenv('DUNE_API_KEY') 
         
@@ -25,7 +34,86 @@ class DuneAnalyticsService:
         
         self.headers: Dict[str, str] = {"X-Dune-API-Key": self.api_key}
         
-        self.endpoint: str = f"{self.DUNE_API_URL}{self.QUERY_ID}/results?limit={self.LIMIT}"
+        self.endpoint: str = f"{self.DUNE_API_URL}{self.QUERY_ID}/results"
+        self.cache = cache
+        self.cache_key: str = f"dune_top_delegates:{self.QUERY_ID}"
+
+    def _fetch_results(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        response = http_client.get(self.endpoint, params=params, headers=self.headers, timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+    def _fetch_latest_execution(self, value_column: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Execution metadata (execution_id, execution_ended_at) of the latest
+        results. Dune has no per-query status endpoint, so this is a results
+        request cut down to one row, and to the value column once it is known.
+        """
+        params: Dict[str, Any] = {"limit": 1}
+        if value_column:
+            params["columns"] = value_column
+        return self._fetch_results(params)
+
+    def _fetch_top_rows(self, value_column: str) -> Dict[str, Any]:
+        """The top LIMIT values of the latest execution, always requested with the same projection and order."""
+        return self._fetch_results({
+            "limit": self.LIMIT,
+            "columns": value_column,
+            "sort_by": f"{value_column} desc",
+        })
+
+    @staticmethod
+    def _find_value_column(rows: List[Dict[str, Any]]) -> Optional[str]:
+        """The first column holding a positive number, as the metric has always used."""
+        for row in rows:
+            for column, value in row.items():
+                if isinstance(value, (int, float)) and value > 0:
+                    return column
+        return None
+
+    def _refresh_metric(self) -> Dict[str, Any]:
+        """
+        Builds the cache entry: reuses the previous metric when the latest
+        execution is the one it was computed from, otherwise downloads the top
+        rows and recomputes it. Raises LookupError if no delegate amounts can
+        be extracted.
+        """
+        previous = self.cache.get_entry(self.cache_key)
+        previous = previous["value"] if previous else None
+        value_column = previous.get("value_column") if previous else None
+
+        latest = self._fetch_latest_execution(value_column)
+        sample = latest.get('result', {}).get('rows', [])
+        if value_column is not None and sample and value_column not in sample[0]:
+            # The query's columns changed; look the value column up again.
+            value_column = None
+            latest = self._fetch_latest_execution()
+            sample = latest.get('result', {}).get('rows', [])
+
+        execution_id = latest.get('execution_id')
+        if previous and execution_id is not None and previous.get("execution_id") == execution_id:
+            return previous
+
+        if value_column is None:
+            value_column = self._find_value_column(sample)
+        if value_column is None:
+            raise LookupError("Dune query returned data but failed to extract valid numeric delegate amounts.")
+
+        data = self._fetch_top_rows(value_column)
+        rows: List[Dict[str, Any]] = data.get('result', {}).get('rows', [])
+        delegate_values: List[float] = [
+            float(row[value_column]) for row in rows[:self.LIMIT]
+            if isinstance(row.get(value_column), (int, float)) and row[value_column] > 0
+        ]
+        if not delegate_values:
+            raise LookupError("Dune query returned data but failed to extract valid numeric delegate amounts.")
+
+        return {
+            "execution_id": data.get('execution_id', execution_id),
+            "execution_ended_at": data.get('execution_ended_at'),
+            "value_column": value_column,
+            "divided_value": sum(delegate_values) / (10**9),
+        }
 
     def get_top_delegate_sum_metric(self) -> Dict[str, Any]:
         """
@@ -37,35 +125,11 @@ class DuneAnalyticsService:
                             On failure, returns {"error": str, "status": int}.
         """
         try:
-            
-            response = requests.get(self.endpoint, headers=self.headers, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            
-            rows: List[Dict[str, Any]] = data.get('result', {}).get('rows', [])
-            
-            
-            top_3_rows = rows[:3]
-            
-            delegate_values: List[float] = []
-            for row in top_3_rows:
-                
-                for value in row.values():
-                    if isinstance(value, (int, float)) and value > 0:
-                        delegate_values.append(float(value))
-                        break
-            
-            if not delegate_values:
-                
-                return {"error": "Dune query returned data but failed to extract valid numeric delegate amounts.", "status": 404}
-            
-            total_sum = sum(delegate_values)
-            
-            divided_value = total_sum / (10**9)
-            
-            
-            return {"divided_value": divided_value}
-            
+            entry = self.cache.get_or_refresh(self.cache_key, self.RECHECK_SECONDS, self._refresh_metric)
+            return {"divided_value": entry["divided_value"]}
+
+        except LookupError as e:
+            return {"error": str(e), "status": 404}
         except requests.exceptions.HTTPError as e:
             status_code = e.response.status_code if e.response is not None else 500
             return {"error": f"HTTP Error fetching Dune data: {e}", "status": status_code}
@@ -78,8 +142,9 @@ class DuneAnalyticsService:
 try:
     dune_analytics_service = DuneAnalyticsService()
 except ValueError as e:
-    
+    _init_error = str(e)
+
     class FailedDuneAnalyticsService:
         def get_top_delegate_sum_metric(self) -> Dict[str, Any]:
-            return {"error": f"Dune service initialization failed: {str(e)}", "status": 500}
+            return {"error": f"Dune service initialization failed: {_init_error}", "status": 500}
     dune_analytics_service = FailedDuneAnalyticsService()
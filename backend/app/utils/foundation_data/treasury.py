@@ -1,15 +1,274 @@
 import os
+import time
 import requests
 import json
+import numpy as np
 from datetime import datetime, timedelta
 from web3 import Web3
-from web3.exceptions import ContractLogicError
+from eth_abi import decode as abi_decode
 from dotenv import load_dotenv
 from typing import Dict, Any, List, Optional, Tuple
+from ..http_client import http_client
+from ..local_store import LocalStore, local_store
+from ..shared_cache import SharedCache, shared_cache
 
 
 load_dotenv('.env')
 
+
+class TreasuryOutflowLedger:
+    """
+    Local ledger of the treasury's outgoing ETH and ERC20 transfers.
+
+    Each Etherscan action (txlist, tokentx) has its own block cursor, so a
+    sync only pages through blocks it has not seen yet, and an action is not
+    synced again within SYNC_INTERVAL_SECONDS. The cursor's own block is
+    fetched again on the next sync in case it was only partly indexed.
+
+    Rows are keyed by (tx_hash, log_index), one per transfer: a normal
+    transaction's own value transfer has log_index -1, and token transfers
+    use the event's log index. That makes re-ingesting a page a no-op while
+    identical transfers within one transaction are still counted separately.
+    """
+
+    SCHEMA = """
+    DROP TABLE IF EXISTS treasury_outflow;
+    DROP TABLE IF EXISTS treasury_ledger_cursor;
+    CREATE TABLE IF NOT EXISTS treasury_transfer_out (
+        tx_hash TEXT NOT NULL,
+        log_index INTEGER NOT NULL,
+        asset TEXT NOT NULL,
+        recipient TEXT NOT NULL,
+        raw_value TEXT NOT NULL,
+        symbol TEXT NOT NULL,
+        amount REAL NOT NULL,
+        block_number INTEGER NOT NULL,
+        timestamp INTEGER NOT NULL,
+        PRIMARY KEY (tx_hash, log_index)
+    );
+    CREATE INDEX IF NOT EXISTS treasury_transfer_out_timestamp ON treasury_transfer_out (timestamp);
+    CREATE TABLE IF NOT EXISTS treasury_transfer_cursor (
+        action TEXT PRIMARY KEY,
+        last_block INTEGER NOT NULL,
+        synced_at REAL NOT NULL
+    );
+    """
+    ETHERSCAN_URL = "https://api.etherscan.io/api"
+    ACTIONS = ('txlist', 'tokentx')
+    PAGE_SIZE = 1000
+    # Etherscan refuses page * offset > 10000; past that the window restarts
+    # from the last block seen.
+    MAX_RESULT_WINDOW = 10000
+    SYNC_INTERVAL_SECONDS: float = float(os.getenv('TREASURY_LEDGER_SYNC_SECONDS', '300'))
+
+    def __init__(self, address: str, api_key: str, token_map: Dict[str, Tuple[str, int]],
+                 store: LocalStore = local_store):
+        self.address = address.lower()
+        self.api_key = api_key
+        self.token_map = token_map
+        self.store = store
+        self.store.ensure_schema(self.SCHEMA)
+
+    def _cursor(self, action: str) -> Tuple[int, float]:
+        row = self.store.fetchone("SELECT last_block, synced_at FROM treasury_transfer_cursor WHERE action = ?", (action,))
+        return (row["last_block"], row["synced_at"]) if row else (0, 0.0)
+
+    def last_block(self, action: str) -> int:
+        return self._cursor(action)[0]
+
+    def _fetch_page(self, action: str, start_block: int, page: int) -> List[Dict[str, Any]]:
+        response = http_client.get(self.ETHERSCAN_URL, params={
+            'module': 'account', 'action': action, 'address': self.address,
+            'startblock': start_block, 'endblock': 99999999,
+            'page': page, 'offset': self.PAGE_SIZE, 'sort': 'asc', 'apikey': self.api_key,
+        }, timeout=15)
+        response.raise_for_status()
+        payload = response.json()
+        result = payload.get('result', [])
+        if payload.get('status') == '0' and not isinstance(result, list):
+            # "No transactions found" comes back as status 0 with an empty list;
+            # anything else (rate limit, bad key) carries a message string.
+            raise ValueError(f"Etherscan {action} error: {result or payload.get('message')}")
+        return result
+
+    def _to_row(self, action: str, tx: Dict[str, Any], log_index: int) -> Optional[Tuple[Any, ...]]:
+        if tx['from'].lower() != self.address or int(tx['value']) <= 0:
+            return None
+        if action == 'txlist':
+            asset, symbol, decimals = 'ETH', 'ETH', 18
+        else:
+            asset = tx['contractAddress'].lower()
+            symbol, decimals = self.token_map.get(asset, ('UNKNOWN', 18))
+        return (tx['hash'], log_index, asset, tx['to'].lower(), tx['value'], symbol,
+                int(tx['value']) / 10 ** decimals, int(tx['blockNumber']), int(tx['timeStamp']))
+
+    @staticmethod
+    def _log_indexes(action: str, txs: List[Dict[str, Any]], ordinals: Dict[str, int]) -> List[int]:
+        """
+        Per-transfer keys within each transaction. Token transfers use
+        Etherscan's logIndex when it is reported, otherwise their position
+        among the transaction's transfers in this block window (results are
+        in log order, and every window starts at a block boundary).
+        """
+        indexes = []
+        for tx in txs:
+            if action == 'txlist':
+                indexes.append(-1)
+                continue
+            ordinal = ordinals.get(tx['hash'], 0)
+            ordinals[tx['hash']] = ordinal + 1
+            log_index = tx.get('logIndex')
+            indexes.append(int(log_index) if log_index not in (None, '') else ordinal)
+        return indexes
+
+    def _store_page(self, action: str, txs: List[Dict[str, Any]], last_block: int, ordinals: Dict[str, int]) -> None:
+        rows = [self._to_row(action, tx, log_index)
+                for tx, log_index in zip(txs, self._log_indexes(action, txs, ordinals))]
+        with self.store.transaction() as conn:
+            conn.executemany(
+                """
+                INSERT OR IGNORE INTO treasury_transfer_out
+                    (tx_hash, log_index, asset, recipient, raw_value, symbol, amount, block_number, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [row for row in rows if row is not None]
+            )
+            conn.execute(
+                """
+                INSERT INTO treasury_transfer_cursor (action, last_block, synced_at) VALUES (?, ?, ?)
+                ON CONFLICT(action) DO UPDATE SET
+                    last_block = MAX(last_block, excluded.last_block), synced_at = excluded.synced_at
+                """,
+                (action, last_block, time.time())
+            )
+
+    def sync_action(self, action: str) -> int:
+        """Ingests the blocks of one action past its cursor; returns the number of transactions read."""
+        start_block = self.last_block(action)
+        page = 1
+        seen = 0
+        ordinals: Dict[str, int] = {}
+        while True:
+            txs = self._fetch_page(action, start_block, page)
+            if not txs:
+                self._store_page(action, [], start_block, ordinals)
+                return seen
+            seen += len(txs)
+            last_block = int(txs[-1]['blockNumber'])
+            self._store_page(action, txs, last_block, ordinals)
+            if len(txs) < self.PAGE_SIZE:
+                return seen
+            if (page + 1) * self.PAGE_SIZE > self.MAX_RESULT_WINDOW:
+                if last_block == start_block:
+                    raise ValueError(f"Etherscan {action}: block {last_block} exceeds the result window")
+                start_block, page = last_block, 1
+                ordinals = {}
+            else:
+                page += 1
+
+    def sync(self, force: bool = False) -> None:
+        """Syncs every action whose last sync is older than SYNC_INTERVAL_SECONDS (all of them with `force`)."""
+        now = time.time()
+        for action in self.ACTIONS:
+            if force or now - self._cursor(action)[1] >= self.SYNC_INTERVAL_SECONDS:
+                self.sync_action(action)
+
+    def outflows_since(self, start_timestamp: int) -> List[Dict[str, Any]]:
+        rows = self.store.fetchall(
+            "SELECT timestamp, symbol, amount, tx_hash FROM treasury_transfer_out WHERE timestamp >= ? ORDER BY timestamp DESC",
+            (start_timestamp,)
+        )
+        return [
+            {'timestamp': row['timestamp'], 'symbol': row['symbol'], 'amount': row['amount'], 'tx_hash': row['tx_hash']}
+            for row in rows
+        ]
+
+class TokenPriceHistory:
+    """
+    Daily USD close-of-day prices per CoinGecko coin id, keyed by UTC epoch
+    day. Only completed days are stored, so each coin is topped up at most
+    once a day with the days missing since its last stored one.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS token_price_daily (
+        coin_id TEXT NOT NULL,
+        day INTEGER NOT NULL,
+        price REAL NOT NULL,
+        PRIMARY KEY (coin_id, day)
+    );
+    """
+    MARKET_CHART_URL = "https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart"
+    # The public CoinGecko API serves at most a year of daily history.
+    MAX_HISTORY_DAYS = 365
+    # Daily points are stamped at 00:00 UTC, give or take a few seconds.
+    DAY_BOUNDARY_TOLERANCE_MS = 60_000
+
+    def __init__(self, store: LocalStore = local_store):
+        self.store = store
+        self.store.ensure_schema(self.SCHEMA)
+
+    @staticmethod
+    def today() -> int:
+        return int(time.time()) // 86400
+
+    def last_day(self, coin_id: str) -> Optional[int]:
+        row = self.store.fetchone("SELECT MAX(day) AS day FROM token_price_daily WHERE coin_id = ?", (coin_id,))
+        return row["day"] if row else None
+
+    def sync(self, coin_id: str, first_day: int) -> int:
+        """
+        Stores the missing completed days from `first_day` (or the day after
+        the last stored one) up to yesterday. Returns the number of days stored.
+        """
+        today = self.today()
+        last_day = self.last_day(coin_id)
+        start_day = max(first_day, last_day + 1) if last_day is not None else first_day
+        if start_day >= today:
+            return 0
+
+        response = http_client.get(self.MARKET_CHART_URL.format(coin_id=coin_id), params={
+            'vs_currency': 'usd', 'interval': 'daily',
+            'days': min(today - start_day + 1, self.MAX_HISTORY_DAYS),
+        }, timeout=15)
+        response.raise_for_status()
+        # A daily point at 00:00 UTC opens day D, i.e. it closes day D - 1.
+        # The series also ends with the current intraday price, which is
+        # off the day boundary and must not be stored as a close.
+        closes = {}
+        for ts_ms, price in response.json().get('prices', []):
+            day, offset_ms = divmod(int(ts_ms), 86400000)
+            if offset_ms <= self.DAY_BOUNDARY_TOLERANCE_MS:
+                closes[day - 1] = price
+            elif offset_ms >= 86400000 - self.DAY_BOUNDARY_TOLERANCE_MS:
+                closes[day] = price
+        rows = [(coin_id, day, price) for day, price in closes.items()
+                if start_day <= day < today and price is not None]
+        self.store.executemany(
+            "INSERT OR REPLACE INTO token_price_daily (coin_id, day, price) VALUES (?, ?, ?)", rows
+        )
+        return len(rows)
+
+    def daily_prices(self, coin_id: str, first_day: int, last_day: int, fallback: float) -> np.ndarray:
+        """
+        Dense array of prices for days first_day..last_day. Gaps, including
+        the current day, take the previous known price; days before the
+        first known price take `fallback` (the current spot price).
+        """
+        rows = self.store.fetchall(
+            "SELECT day, price FROM token_price_daily WHERE coin_id = ? AND day BETWEEN ? AND ? ORDER BY day",
+            (coin_id, first_day, last_day)
+        )
+        prices = np.full(last_day - first_day + 1, np.nan)
+        if rows:
+            prices[[row["day"] - first_day for row in rows]] = [row["price"] for row in rows]
+        # Forward fill: index of the last known price at or before each day.
+        known = np.where(np.isnan(prices), 0, np.arange(len(prices)))
+        np.maximum.accumulate(known, out=known)
+        filled = prices[known]
+        return np.where(np.isnan(filled), fallback, filled)
+
+
 class TreasuryAnalyticsService:
     """
     Service class to calculate Uniswap Treasury balance, spending analysis, 
@@ -26,7 +285,39 @@ class TreasuryAnalyticsService:
             "outputs": [{"name": "balance", "type": "uint256"}],
             "type": "function"
         }
-    ]    
+    ]
+    # Multicall3 is deployed at the same address on every major chain.
+    MULTICALL3_ADDRESS: str = '0xcA11bde05977b3631167028862bE2a173976CA11'
+    MULTICALL3_ABI: List[Dict[str, Any]] = [
+        {
+            "inputs": [{"components": [
+                {"name": "target", "type": "address"},
+                {"name": "allowFailure", "type": "bool"},
+                {"name": "callData", "type": "bytes"}
+            ], "name": "calls", "type": "tuple[]"}],
+            "name": "aggregate3",
+            "outputs": [{"components": [
+                {"name": "success", "type": "bool"},
+                {"name": "returnData", "type": "bytes"}
+            ], "name": "returnData", "type": "tuple[]"}],
+            "stateMutability": "payable",
+            "type": "function"
+        },
+        {
+            "inputs": [{"name": "addr", "type": "address"}],
+            "name": "getEthBalance",
+            "outputs": [{"name": "balance", "type": "uint256"}],
+            "stateMutability": "view",
+            "type": "function"
+        },
+        {
+            "inputs": [],
+            "name": "getBlockNumber",
+            "outputs": [{"name": "blockNumber", "type": "uint256"}],
+            "stateMutability": "view",
+            "type": "function"
+        }
+    ]
     TOKENS: Dict[str, Dict[str, Any]] = {
         'ETH': {'contract': None, 'id': 'ethereum', 'decimals': 18},
         'UNI': {'contract': '0x1f9840a85d5af5bf1d1762f925bdaddc4201f984', 'id': 'uniswap', 'decimals': 18},
@@ -35,56 +326,88 @@ class TreasuryAnalyticsService:
         'DAI': {'contract': '0x6b175474e89094c44da98b954eedeac495271d0f', 'id': 'dai', 'decimals': 18},
     }
 
-    def __init__(self):
+    ANALYSIS_CACHE_KEY = 'treasury_analysis'
+
+    def __init__(self, cache: SharedCache = shared_cache):
         if not self.ETHERSCAN_API_KEY or not self.RPC_URL:
             raise ValueError("ETHERSCAN_API_KEY and RPC_URL must be set for TreasuryAnalyticsService.")
 
-        self.w3 = Web3(Web3.HTTPProvider(self.RPC_URL))
+        self.w3 = Web3(Web3.HTTPProvider(self.RPC_URL, session=http_client.session_for(self.RPC_URL)))
         self.treasury_address_checksum = Web3.to_checksum_address(self.TREASURY_ADDRESS)
         
         
-        self._analysis_cache: Dict[str, Any] = {}
-        self._cache_timestamp: Optional[datetime] = None
-        self._cache_duration_minutes = 10 
+        # Shared by every worker, so only one of them refreshes at a time.
+        self._analysis_cache = cache
+        self._cache_duration_minutes = 10
 
         
         for symbol, info in self.TOKENS.items():
             if info['contract']:
                 info['contract'] = Web3.to_checksum_address(info['contract'])
 
-    def _check_cache(self) -> bool:
-        """Checks if the cached analysis is still valid."""
-        if self._analysis_cache and self._cache_timestamp:
-            return (datetime.utcnow() - self._cache_timestamp) < timedelta(minutes=self._cache_duration_minutes)
-        return False
-    
+        self._multicall = self.w3.eth.contract(
+            address=Web3.to_checksum_address(self.MULTICALL3_ADDRESS), abi=self.MULTICALL3_ABI
+        )
+        self._balance_calls = self._build_balance_calls()
+
+        token_map = {info['contract'].lower(): (s, info['decimals']) for s, info in self.TOKENS.items() if info['contract']}
+        self.outflow_ledger = TreasuryOutflowLedger(self.TREASURY_ADDRESS, self.ETHERSCAN_API_KEY, token_map)
+        self.price_history = TokenPriceHistory()
+
+    def _build_balance_calls(self) -> List[Tuple[str, str, str]]:
+        """
+        Encodes, once, the (symbol, target, callData) triples of a balance
+        snapshot: the block number first, then one balance read per token.
+        """
+        calls: List[Tuple[str, str, str]] = [
+            ('_block', self._multicall.address, self._multicall.encode_abi('getBlockNumber'))
+        ]
+        erc20 = self.w3.eth.contract(abi=self.MINIMAL_ABI)
+        for symbol, info in self.TOKENS.items():
+            if info['contract'] is None:
+                calls.append((symbol, self._multicall.address,
+                               self._multicall.encode_abi('getEthBalance', args=[self.treasury_address_checksum])))
+            else:
+                calls.append((symbol, info['contract'],
+                               erc20.encode_abi('balanceOf', args=[self.treasury_address_checksum])))
+        return calls
+
     def _get_prices(self) -> Dict[str, float]:
         """Fetches current token prices from CoinGecko."""
         ids = ','.join([token['id'] for token in self.TOKENS.values()])
         url = f"https://api.coingecko.com/api/v3/simple/price?ids={ids}&vs_currencies=usd"
-        response = requests.get(url, timeout=10)
+        response = http_client.get(url, timeout=10)
         response.raise_for_status()
         return {id: data['usd'] for id, data in response.json().items()}
 
-    def _get_balance(self, token_info: Dict[str, Any]) -> float:
-        """Gets the balance of a specific token for the treasury address."""
-        if token_info['contract'] is None:  
-            balance = self.w3.eth.get_balance(self.treasury_address_checksum)
-        else:
-            contract = self.w3.eth.contract(address=token_info['contract'], abi=self.MINIMAL_ABI)
-            try:
-                balance = contract.functions.balanceOf(self.treasury_address_checksum).call()
-            except ContractLogicError:
-                balance = 0
-        return balance / 10 ** token_info['decimals']
-
-    def _calculate_treasury_balance(self, prices: Dict[str, float]) -> Tuple[Dict[str, Any], float]:
+    def _get_balances(self) -> Tuple[Dict[str, float], int]:
+        """
+        Reads every treasury balance in a single eth_call to Multicall3's
+        aggregate3, so all amounts come from the same block. Returns the
+        token amounts and that block number. A token whose balanceOf reverts
+        counts as 0.
+        """
+        calls = [(target, True, call_data) for _, target, call_data in self._balance_calls]
+        results = self._multicall.functions.aggregate3(calls).call()
+
+        amounts: Dict[str, float] = {}
+        block_number = 0
+        for (symbol, _, _), (success, return_data) in zip(self._balance_calls, results):
+            value = abi_decode(['uint256'], return_data)[0] if success and len(return_data) >= 32 else 0
+            if symbol == '_block':
+                block_number = value
+            else:
+                amounts[symbol] = value / 10 ** self.TOKENS[symbol]['decimals']
+        return amounts, block_number
+
+    def _calculate_treasury_balance(self, prices: Dict[str, float]) -> Tuple[Dict[str, Any], float, float, int]:
         """Calculates the current USD value and breakdown of the treasury."""
         balances: Dict[str, Any] = {}
         total_usd = 0.0
-        
+        amounts, block_number = self._get_balances()
+
         for symbol, info in self.TOKENS.items():
-            amount = self._get_balance(info)
+            amount = amounts[symbol]
             price = prices[info['id']]
             value_usd = amount * price
             balances[symbol] = {
@@ -99,120 +422,118 @@ class TreasuryAnalyticsService:
         stable_usd = sum(balances[s]['value_usd'] for s in stablecoins if s in balances)
         stable_pct = (stable_usd / total_usd * 100) if total_usd > 0 else 0
         
-        return balances, total_usd, stable_pct
+        return balances, total_usd, stable_pct, block_number
 
     def _fetch_outflows(self, last_months: int = 6) -> List[Dict[str, Any]]:
-        """Fetches recent ETH and ERC20 transaction outflows from Etherscan."""
+        """
+        Brings the outflow ledger up to date with Etherscan and returns the
+        ETH and ERC20 outflows of the last `last_months` months from it.
+        """
         start_timestamp = int((datetime.utcnow() - timedelta(days=30*last_months)).timestamp())
-        outflows: List[Dict[str, Any]] = []
-        eth_url = f"https://api.etherscan.io/api?module=account&action=txlist&address={self.TREASURY_ADDRESS}&startblock=0&endblock=99999999&sort=desc&apikey={self.ETHERSCAN_API_KEY}"
-        eth_response = requests.get(eth_url, timeout=15)
-        eth_response.raise_for_status()
-        txs = eth_response.json().get('result', [])
-        token_url = f"https://api.etherscan.io/api?module=account&action=tokentx&address={self.TREASURY_ADDRESS}&startblock=0&endblock=99999999&sort=desc&apikey={self.ETHERSCAN_API_KEY}"
-        token_response = requests.get(token_url, timeout=15)
-        token_response.raise_for_status()
-        token_txs = token_response.json().get('result', [])
-        token_map = {info['contract'].lower(): (s, info['decimals']) for s, info in self.TOKENS.items() if info['contract']}
-        for tx in txs:
-            ts = int(tx['timeStamp'])
-            if ts < start_timestamp: continue
-            if tx['from'].lower() == self.TREASURY_ADDRESS.lower() and int(tx['value']) > 0:
-                outflows.append({
-                    'timestamp': ts,
-                    'symbol': 'ETH',
-                    'amount': int(tx['value']) / 10**18,
-                    'tx_hash': tx['hash']
-                })
-        for tx in token_txs:
-            ts = int(tx['timeStamp'])
-            if ts < start_timestamp: continue
-            if tx['from'].lower() == self.TREASURY_ADDRESS.lower() and int(tx['value']) > 0:
-                symbol, decimals = token_map.get(tx['contractAddress'].lower(), ('UNKNOWN', 18))
-                outflows.append({
-                    'timestamp': ts,
-                    'symbol': symbol,
-                    'amount': int(tx['value']) / 10**decimals,
-                    'tx_hash': tx['hash']
-                })
-        
-        return outflows
-    def _calculate_spending(self, outflows: List[Dict[str, Any]], prices: Dict[str, float], last_months: int = 6) -> Tuple[float, List[Dict[str, Any]]]:
-        """Analyzes outflow transactions to determine average monthly spending."""
-        monthly_spend: Dict[str, Dict[str, Any]] = {}
-        total_spend_usd = 0.0
+        self.outflow_ledger.sync()
+        return self.outflow_ledger.outflows_since(start_timestamp)
+
+    def _spending_month_keys(self, last_months: int) -> List[str]:
+        month_keys: List[str] = []
         now = datetime.utcnow()
         for i in range(last_months):
             month_start = (now - timedelta(days=30*(i+1))).replace(day=1)
             month_key = month_start.strftime('%Y-%m')
-            monthly_spend[month_key] = {'total_spent': 0.0, 'transactions_count': 0}
+            if month_key not in month_keys:
+                month_keys.append(month_key)
+        return month_keys
 
-        
-        for outflow in outflows:
-            symbol = outflow['symbol']
-            if symbol not in self.TOKENS: continue 
+    def _calculate_spending(self, outflows: List[Dict[str, Any]], prices: Dict[str, float], last_months: int = 6) -> Tuple[float, List[Dict[str, Any]]]:
+        """
+        Analyzes outflow transactions to determine average monthly spending.
+        Each outflow is valued at its token's price on the day it was sent,
+        and the valuation runs as array operations per token rather than per
+        transaction.
+        """
+        month_keys = self._spending_month_keys(last_months)
+        month_index = {key: i for i, key in enumerate(month_keys)}
+        month_totals = np.zeros(len(month_keys))
+        month_counts = np.zeros(len(month_keys), dtype=np.int64)
+
+        if outflows:
+            symbols = np.array([o['symbol'] for o in outflows])
+            timestamps = np.fromiter((o['timestamp'] for o in outflows), dtype=np.int64, count=len(outflows))
+            amounts = np.fromiter((o['amount'] for o in outflows), dtype=np.float64, count=len(outflows))
+            months, inverse = np.unique(timestamps.astype('datetime64[s]').astype('datetime64[M]').astype(str), return_inverse=True)
+            buckets = np.array([month_index.get(m, -1) for m in months])[inverse]
+            days = timestamps // 86400
+            today = self.price_history.today()
+
+            for symbol, info in self.TOKENS.items():
+                spot_price = prices.get(info['id'], 0.0)
+                selected = (symbols == symbol) & (buckets >= 0)
+                if spot_price <= 0 or not selected.any():
+                    continue
+                token_days = np.minimum(days[selected], today)
+                first_day = int(token_days.min())
+                try:
+                    self.price_history.sync(info['id'], first_day)
+                except requests.exceptions.RequestException:
+                    pass  # value with the stored history, falling back to the spot price
+                daily = self.price_history.daily_prices(info['id'], first_day, today, spot_price)
+                values = amounts[selected] * daily[token_days - first_day]
+
+                month_totals += np.bincount(buckets[selected], weights=values, minlength=len(month_keys))
+                month_counts += np.bincount(buckets[selected], minlength=len(month_keys))
+
+        total_spend_usd = float(month_totals.sum())
+        avg_monthly_spend = total_spend_usd / last_months if last_months > 0 else 0.0
+
+        spending_months = [{'month': k, 'total_spent': round(float(month_totals[i]), 2), 'transactions_count': int(month_counts[i])}
+                           for i, k in enumerate(month_keys)]
+
+        return avg_monthly_spend, spending_months
+
+    def _run_analysis(self) -> Dict[str, Any]:
+        """
+        Runs the full analysis chain (prices, balance, outflows, spending,
+        runway, ratio). Upstream failures propagate as exceptions.
+        """
+        prices = self._get_prices()
             
-            dt = datetime.fromtimestamp(outflow['timestamp'])
-            month_key = dt.strftime('%Y-%m')
             
-            if month_key in monthly_spend:
-                price_id = self.TOKENS[symbol]['id']
-                price = prices.get(price_id, 0.0)
-                
-                if price > 0:
-                    value_usd = outflow['amount'] * price
-                    monthly_spend[month_key]['total_spent'] += value_usd
-                    monthly_spend[month_key]['transactions_count'] += 1
-                    total_spend_usd += value_usd
+        balances, total_usd, stable_pct, balance_block = self._calculate_treasury_balance(prices)
         
-        avg_monthly_spend = total_spend_usd / last_months if last_months > 0 else 0.0
         
+        outflows = self._fetch_outflows()
         
-        spending_months = [{'month': k, 'total_spent': round(v['total_spent'], 2), 'transactions_count': v['transactions_count']} 
-                           for k, v in monthly_spend.items()]
         
-        return avg_monthly_spend, spending_months
+        avg_monthly_spend, spending_months = self._calculate_spending(outflows, prices)
+        
+        
+        
+        
+        runway_months = total_usd / avg_monthly_spend if avg_monthly_spend > 0 else 0
+        
+        
+        current_ratio = total_usd / avg_monthly_spend if avg_monthly_spend > 0 else 0
+
+        
+        return {
+            "total_usd": round(total_usd, 2),
+            "runway_months": round(runway_months, 1),
+            "current_ratio": round(current_ratio, 2),
+            "avg_monthly_spend_usd": round(avg_monthly_spend, 2),
+            "stablecoin_percentage": round(stable_pct, 1),
+            "balance_block": balance_block,
+            "spending_months": spending_months,
+        }
 
     def _get_cached_analysis(self) -> Dict[str, Any]:
         """
-        Runs the full analysis chain (prices, balance, outflows, spending, 
-        runway, ratio) and caches the results, or returns the cached data.
+        Returns the shared cached analysis, refreshing it when it is older
+        than the cache duration. While another worker refreshes, the previous
+        analysis is served.
         """
-        if self._check_cache():
-            return self._analysis_cache
-        
         try:
-            prices = self._get_prices()
-            
-            
-            balances, total_usd, stable_pct = self._calculate_treasury_balance(prices)
-            
-            
-            outflows = self._fetch_outflows()
-            
-            
-            avg_monthly_spend, spending_months = self._calculate_spending(outflows, prices)
-            
-            
-            
-            
-            runway_months = total_usd / avg_monthly_spend if avg_monthly_spend > 0 else 0
-            
-            
-            current_ratio = total_usd / avg_monthly_spend if avg_monthly_spend > 0 else 0
-
-            
-            self._analysis_cache = {
-                "total_usd": round(total_usd, 2),
-                "runway_months": round(runway_months, 1),
-                "current_ratio": round(current_ratio, 2),
-                "avg_monthly_spend_usd": round(avg_monthly_spend, 2),
-                "stablecoin_percentage": round(stable_pct, 1),
-                "spending_months": spending_months,
-            }
-            self._cache_timestamp = datetime.utcnow()
-            return self._analysis_cache
-
+            return self._analysis_cache.get_or_refresh(
+                self.ANALYSIS_CACHE_KEY, self._cache_duration_minutes * 60, self._run_analysis
+            )
         except requests.exceptions.HTTPError as e:
             status_code = e.response.status_code if e.response is not None else 500
             return {"error": f"API Error (HTTP {status_code}) fetching treasury data: {e}", "status": status_code}
@@ -251,12 +572,13 @@ class TreasuryAnalyticsService:
 try:
     treasury_analytics_service = TreasuryAnalyticsService()
 except ValueError as e:
-    
+    _init_error = str(e)
+
     class FailedTreasuryAnalyticsService:
         def get_treasury_balance_usd(self) -> Dict[str, Any]:
-            return {"error": f"Treasury service initialization failed: {str(e)}", "status": 500}
+            return {"error": f"Treasury service initialization failed: {_init_error}", "status": 500}
         def get_treasury_runway_months(self) -> Dict[str, Any]:
-            return {"error": f"Treasury service initialization failed: {str(e)}", "status": 500}
+            return {"error": f"Treasury service initialization failed: {_init_error}", "status": 500}
         def get_treasury_to_expense_ratio(self) -> Dict[str, Any]:
-            return {"error": f"Treasury service initialization failed: {str(e)}", "status": 500}
+            return {"error": f"Treasury service initialization failed: {_init_error}", "status": 500}
     treasury_analytics_service = FailedTreasuryAnalyticsService()
@@ -1,7 +1,250 @@
+import ijson
 import requests
-from datetime import datetime, timedelta
-from collections import defaultdict
-from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from datetime import datetime
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple, Sequence
+from ..http_client import http_client
+from ..local_store import LocalStore, local_store
+
+
+DATE_FORMATS: Tuple[str, ...] = (
+    "%Y-%m-%d",
+    "%Y-%m-%dT%H:%M:%S.%fZ",
+    "%Y-%m-%dT%H:%M:%SZ",
+    "%Y-%m-%d %H:%M:%S",
+)
+ROLLING_TREND_WINDOWS: Tuple[int, ...] = (7, 30, 90)
+EPOCH_ORDINAL: int = datetime(1970, 1, 1).toordinal()
+DEFAULT_TREND_HORIZONS: Tuple[int, ...] = (7, 30, 90, 365)
+
+
+def detect_date_format(sample: Any) -> str:
+    """
+    Returns one of DATE_FORMATS, or 'epoch_s' / 'epoch_ms' for numeric
+    timestamps, for a sample value of a date column.
+    """
+    text = str(sample)
+    for fmt in DATE_FORMATS:
+        try:
+            datetime.strptime(text, fmt)
+            return fmt
+        except ValueError:
+            continue
+    try:
+        timestamp = float(text)
+    except (ValueError, TypeError):
+        raise ValueError(f"Unable to parse date: {text}")
+    # Seconds since 1970 stay below 1e11 until the year 5138.
+    return 'epoch_ms' if abs(timestamp) >= 1e11 else 'epoch_s'
+
+
+def parse_dates_to_days(values: Sequence[Any], fmt: str) -> np.ndarray:
+    """
+    Parses a whole date column of the given format into UTC epoch days.
+    Raises ValueError if any value does not match the format.
+    """
+    if fmt in ('epoch_s', 'epoch_ms'):
+        seconds = np.asarray(values, dtype=np.float64)
+        if fmt == 'epoch_ms':
+            seconds = seconds / 1000
+        return np.floor(seconds / 86400).astype(np.int64)
+    # Every supported text format starts with the ISO calendar date.
+    return np.array([str(v)[:10] for v in values], dtype='datetime64[D]').astype(np.int64)
+
+
+def _window_sums(values: np.ndarray, window: int) -> np.ndarray:
+    cumulative = np.concatenate(([0.0], np.cumsum(values)))
+    return cumulative[window:] - cumulative[:-window] if len(values) >= window else np.zeros(0)
+
+
+def _least_squares_slope(n: np.ndarray, sx: np.ndarray, sy: np.ndarray,
+                         sxx: np.ndarray, sxy: np.ndarray) -> np.ndarray:
+    """Slopes of y over x from per-group sums; 0 where x does not vary."""
+    denominator = n * sxx - sx * sx
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (n * sxy - sx * sy) / denominator
+    return np.where(denominator > 0, slope, 0.0)
+
+
+def weekly_regression_slopes(days: np.ndarray, tvl: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Groups a (days, tvl) series by ISO week and fits a least-squares line
+    per week. Returns per-week arrays: week_start (epoch day of the Monday),
+    count, slope (USD per day), start_tvl and end_tvl.
+    """
+    order = np.argsort(days, kind='stable')
+    days, tvl = days[order], tvl[order]
+    # Epoch day 0 was a Thursday.
+    week_starts = days - (days + 3) % 7
+    weeks, group, counts = np.unique(week_starts, return_inverse=True, return_counts=True)
+    x = (days - week_starts).astype(np.float64)
+
+    def group_sum(weights: np.ndarray) -> np.ndarray:
+        return np.bincount(group, weights=weights, minlength=len(weeks))
+
+    slope = _least_squares_slope(counts.astype(np.float64), group_sum(x), group_sum(tvl),
+                                 group_sum(x * x), group_sum(x * tvl))
+    first = np.cumsum(counts) - counts
+    last = np.cumsum(counts) - 1
+    return {"week_start": weeks, "count": counts, "slope": slope,
+            "start_tvl": tvl[first], "end_tvl": tvl[last]}
+
+
+def daily_series(days: np.ndarray, tvl: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Dense daily view of a series: (first_day, values, present). The last
+    value of a day wins; days without data are 0 with present False.
+    """
+    order = np.argsort(days, kind='stable')
+    days, tvl = days[order], tvl[order]
+    first_day = int(days[0])
+    values = np.zeros(int(days[-1]) - first_day + 1)
+    present = np.zeros(len(values), dtype=bool)
+    values[days - first_day] = tvl
+    present[days - first_day] = True
+    return first_day, values, present
+
+
+def rolling_trends(values: np.ndarray, present: np.ndarray,
+                   windows: Sequence[int] = ROLLING_TREND_WINDOWS) -> Dict[int, np.ndarray]:
+    """
+    Least-squares slope (USD per day) over every trailing `window`-day span
+    of a dense daily series, for each window, from shared cumulative sums.
+    Element i of each array is the span ending at day window - 1 + i.
+    """
+    x = np.arange(len(values), dtype=np.float64)
+    n = present.astype(np.float64)
+    y = np.where(present, values, 0.0)
+    x = np.where(present, x, 0.0)
+    trends: Dict[int, np.ndarray] = {}
+    for window in windows:
+        trends[window] = _least_squares_slope(
+            _window_sums(n, window), _window_sums(x, window), _window_sums(y, window),
+            _window_sums(x * x, window), _window_sums(x * y, window)
+        )
+    return trends
+
+def _day_to_str(day: int) -> str:
+    return str(np.datetime64(int(day), 'D'))
+
+
+class TvlHistoryStore:
+    """
+    Daily TVL series per source URL, appended to on every refresh.
+
+    Alongside each day's value the row carries running sums of the series up
+    to and including that day (count, x, tvl, x^2, x*tvl with x the epoch
+    day), so the average and least-squares slope of any trailing horizon is
+    the difference of two rows. Only days from the last stored one onwards
+    are (re)written; the last day is rewritten because its value moves until
+    the day closes.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS tvl_daily (
+        source TEXT NOT NULL,
+        day INTEGER NOT NULL,
+        tvl REAL NOT NULL,
+        cum_count INTEGER NOT NULL,
+        cum_x REAL NOT NULL,
+        cum_tvl REAL NOT NULL,
+        cum_xx REAL NOT NULL,
+        cum_x_tvl REAL NOT NULL,
+        PRIMARY KEY (source, day)
+    );
+    """
+    COLUMNS = ('day', 'tvl', 'cum_count', 'cum_x', 'cum_tvl', 'cum_xx', 'cum_x_tvl')
+
+    def __init__(self, store: LocalStore = local_store):
+        self.store = store
+        self.store.ensure_schema(self.SCHEMA)
+
+    def last_row(self, source: str) -> Optional[Dict[str, Any]]:
+        row = self.store.fetchone(
+            f"SELECT {', '.join(self.COLUMNS)} FROM tvl_daily WHERE source = ? ORDER BY day DESC LIMIT 1", (source,)
+        )
+        return dict(row) if row else None
+
+    def append(self, source: str, days: np.ndarray, tvl: np.ndarray) -> int:
+        """Stores the days of the series from the last stored day onwards; returns how many were written."""
+        if len(days) == 0:
+            return 0
+        first_day, values, present = daily_series(days, tvl)
+        new_days = np.flatnonzero(present) + first_day
+        new_tvl = values[present]
+
+        with self.store.transaction() as conn:
+            last = conn.execute("SELECT MAX(day) AS day FROM tvl_daily WHERE source = ?", (source,)).fetchone()["day"]
+            if last is not None:
+                keep = new_days >= last
+                new_days, new_tvl = new_days[keep], new_tvl[keep]
+            if len(new_days) == 0:
+                return 0
+            base = conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM tvl_daily WHERE source = ? AND day < ? ORDER BY day DESC LIMIT 1",
+                (source, int(new_days[0]))
+            ).fetchone()
+            x = new_days.astype(np.float64)
+            sums = {
+                'cum_count': np.cumsum(np.ones(len(x))),
+                'cum_x': np.cumsum(x),
+                'cum_tvl': np.cumsum(new_tvl),
+                'cum_xx': np.cumsum(x * x),
+                'cum_x_tvl': np.cumsum(x * new_tvl),
+            }
+            if base is not None:
+                sums = {name: column + base[name] for name, column in sums.items()}
+            conn.executemany(
+                f"INSERT OR REPLACE INTO tvl_daily (source, {', '.join(self.COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (source, int(day), float(value), int(sums['cum_count'][i]), float(sums['cum_x'][i]),
+                     float(sums['cum_tvl'][i]), float(sums['cum_xx'][i]), float(sums['cum_x_tvl'][i]))
+                    for i, (day, value) in enumerate(zip(new_days, new_tvl))
+                ]
+            )
+        return len(new_days)
+
+    def load(self, source: str, since_day: int) -> Dict[str, np.ndarray]:
+        """Stored rows of the source from `since_day` on, as column arrays."""
+        rows = self.store.fetchall(
+            f"SELECT {', '.join(self.COLUMNS)} FROM tvl_daily WHERE source = ? AND day >= ? ORDER BY day",
+            (source, since_day)
+        )
+        return {
+            column: np.array([row[column] for row in rows], dtype=np.int64 if column == 'day' else np.float64)
+            for column in self.COLUMNS
+        }
+
+
+def horizon_sums(series: Dict[str, np.ndarray], end: np.ndarray, horizon: int) -> Dict[str, np.ndarray]:
+    """
+    Sums over the trailing `horizon` days ending at each row index in `end`,
+    from the running sums of a loaded series.
+    """
+    days = series['day']
+    start = np.searchsorted(days, days[end] - horizon, side='right')
+    sums = {}
+    for name in ('cum_count', 'cum_x', 'cum_tvl', 'cum_xx', 'cum_x_tvl'):
+        column = series[name]
+        before = np.where(start > 0, column[np.maximum(start - 1, 0)], column[0] - _first_term(series, name))
+        sums[name] = column[end] - before
+    sums['start'] = start
+    return sums
+
+
+def _first_term(series: Dict[str, np.ndarray], name: str) -> float:
+    """The first row's own contribution to a running sum (so its base is sum - term)."""
+    x, tvl = float(series['day'][0]), float(series['tvl'][0])
+    return {'cum_count': 1.0, 'cum_x': x, 'cum_tvl': tvl, 'cum_xx': x * x, 'cum_x_tvl': x * tvl}[name]
+
+
+def _events_until_array_end(events: Iterable[Tuple[str, str, Any]], path: str) -> Iterator[Tuple[str, str, Any]]:
+    """Passes ijson parse events through until the array at `path` closes."""
+    for event in events:
+        yield event
+        if event[0] == path and event[1] == 'end_array':
+            return
+
 
 class LlamaTvlAnalyzer:
     """
@@ -11,15 +254,24 @@ class LlamaTvlAnalyzer:
     """
     
     DEFAULT_API_URL: str = "https://api.llama.fi/treasury/Uniswap"
+    MIN_SERIES_LENGTH: int = 31
 
-    def __init__(self, api_url: str = DEFAULT_API_URL):
-        """Initializes the analyzer with the target API URL."""
+    def __init__(self, api_url: str = DEFAULT_API_URL, streaming: bool = True):
+        """
+        Initializes the analyzer with the target API URL. With `streaming`,
+        once the series has been located in a full response, later refreshes
+        stream the payload and only materialize that series.
+        """
         self.api_url = api_url
+        self.streaming = streaming
+        # {'path', 'date_key', 'tvl_key'} of the series found by _find_tvl_data.
+        self._series_location: Optional[Dict[str, str]] = None
+        self.history = TvlHistoryStore()
 
     def _fetch_data(self) -> Optional[Dict[str, Any]]:
         """Fetch treasury data from DeFi Llama API with error handling."""
         try:
-            response = requests.get(self.api_url, timeout=30)
+            response = http_client.get(self.api_url, timeout=30)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -27,30 +279,73 @@ class LlamaTvlAnalyzer:
             print(f"Error fetching DeFi Llama data from {self.api_url}: {e}")
             return None
 
+    def _stream_series(self, location: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """
+        Streams the API response and extracts only the (date, tvl) pairs of
+        the series at `location`, without building the rest of the payload.
+        Reading stops as soon as the series ends. Returns None if the
+        response cannot be read or no longer has a usable series there.
+        """
+        path, date_key, tvl_key = location['path'], location['date_key'], location['tvl_key']
+        try:
+            with http_client.get(self.api_url, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                response.raw.decode_content = True
+                data = [
+                    {date_key: item.get(date_key), tvl_key: item.get(tvl_key)}
+                    for item in ijson.items(
+                        _events_until_array_end(ijson.parse(response.raw, use_float=True), path), f"{path}.item"
+                    )
+                    if isinstance(item, dict)
+                ]
+        except (requests.exceptions.RequestException, ijson.JSONError) as e:
+            print(f"Error streaming DeFi Llama data from {self.api_url}: {e}")
+            return None
+        if len(data) < self.MIN_SERIES_LENGTH:
+            return None
+        return dict(location, data=data, length=len(data))
+
     def _parse_date(self, date_str: str) -> datetime.date:
         """Parse date string/timestamp in various common formats."""
-        formats = [
-            "%Y-%m-%d",
-            "%Y-%m-%dT%H:%M:%S.%fZ",
-            "%Y-%m-%dT%H:%M:%SZ",
-            "%Y-%m-%d %H:%M:%S",
-        ]
-        
-        for fmt in formats:
-            try:
-                return datetime.strptime(date_str, fmt).date()
-            except ValueError:
-                continue
-        
-        
+        fmt = detect_date_format(date_str)
+        if fmt in ('epoch_s', 'epoch_ms'):
+            return datetime.utcfromtimestamp(float(date_str) / (1000 if fmt == 'epoch_ms' else 1)).date()
+        return datetime.strptime(date_str, fmt).date()
+
+    def _to_arrays(self, tvl_info: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Extracts (epoch days, tvl) arrays from a detected series. The date
+        format is detected on the first entry and the column is parsed in
+        bulk; entries that do not fit are parsed one by one or dropped.
+        """
+        date_key = tvl_info['date_key']
+        tvl_key = tvl_info['tvl_key']
+        entries = [e for e in tvl_info['data'] if isinstance(e, dict) and e.get(date_key) is not None and tvl_key in e]
+        if not entries:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
         try:
-            
-            timestamp = int(float(date_str))
-            return datetime.fromtimestamp(timestamp).date()
+            tvl = np.array([e[tvl_key] if e[tvl_key] is not None else 0.0 for e in entries], dtype=np.float64)
         except (ValueError, TypeError):
+            tvl = None
+        try:
+            fmt = detect_date_format(entries[0][date_key])
+            days = parse_dates_to_days([e[date_key] for e in entries], fmt)
+            if tvl is not None:
+                return days, tvl
+        except ValueError:
             pass
-        
-        raise ValueError(f"Unable to parse date: {date_str}")
+
+        parsed_days: List[int] = []
+        parsed_tvl: List[float] = []
+        for entry in entries:
+            try:
+                date = self._parse_date(str(entry[date_key]))
+                value = float(entry[tvl_key]) if entry[tvl_key] is not None else 0.0
+            except (ValueError, KeyError, TypeError):
+                continue
+            parsed_days.append(date.toordinal() - EPOCH_ORDINAL)
+            parsed_tvl.append(value)
+        return np.array(parsed_days, dtype=np.int64), np.array(parsed_tvl, dtype=np.float64)
 
     def _find_tvl_data(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
@@ -74,7 +369,7 @@ class LlamaTvlAnalyzer:
                             has_tvl = bool(keys & tvl_keys)
                             
                             
-                            if has_date and has_tvl and len(value) > 30:
+                            if has_date and has_tvl and len(value) >= self.MIN_SERIES_LENGTH:
                                 date_key = next(iter(keys & date_keys))
                                 tvl_key = next(iter(keys & tvl_keys))
                                 candidates.append({
@@ -97,71 +392,60 @@ class LlamaTvlAnalyzer:
 
     def _calculate_slopes(self, tvl_info: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Calculates weekly TVL slopes from daily data."""
-        tvl_data = tvl_info['data']
-        date_key = tvl_info['date_key']
-        tvl_key = tvl_info['tvl_key']
-        
-        
-        parsed_data: List[Tuple[datetime.date, float]] = []
-        for entry in tvl_data:
-            try:
-                date = self._parse_date(str(entry[date_key]))
-                tvl = float(entry[tvl_key]) if entry[tvl_key] is not None else 0.0
-                parsed_data.append((date, tvl))
-            except (ValueError, KeyError, TypeError):
-                continue
-        
-        if len(parsed_data) < 7: 
+        return self._weekly_slopes(*self._to_arrays(tvl_info))
+
+    def _weekly_slopes(self, days: np.ndarray, tvl: np.ndarray) -> List[Dict[str, Any]]:
+        """Least-squares slope (USD per day) of every week with at least two points."""
+        if len(days) < 7:
             return []
-        
-        parsed_data.sort(key=lambda x: x[0])
-        
-        
-        weekly_data: Dict[datetime.date, List[Tuple[datetime.date, float]]] = defaultdict(list)
-        for date, tvl in parsed_data:
-            
-            monday = date - timedelta(days=date.weekday())
-            weekly_data[monday].append((date, tvl))
-        
-        
-        weekly_slopes: List[Dict[str, Any]] = []
-        for week_start, week_data in sorted(weekly_data.items()):
-            if len(week_data) < 2:
-                continue
-            
-            week_data.sort(key=lambda x: x[0])
-            
-            first_date, first_tvl = week_data[0]
-            last_date, last_tvl = week_data[-1]
-            
-            days_diff = (last_date - first_date).days
-            
-            
-            slope = (last_tvl - first_tvl) / days_diff if days_diff > 0 else 0.0
-            
-            weekly_slopes.append({
-                "week_start": week_start.strftime("%Y-%m-%d"),
-                "tvl_slope_usd_per_day": round(slope, 2),
-                "start_tvl": round(first_tvl, 2),
-                "end_tvl": round(last_tvl, 2)
-            })
-        
-        return weekly_slopes
+
+        weeks = weekly_regression_slopes(days, tvl)
+        keep = weeks["count"] >= 2
+        week_starts = weeks["week_start"][keep].astype('datetime64[D]').astype(str)
+        slopes = np.round(weeks["slope"][keep], 2)
+        start_tvl = np.round(weeks["start_tvl"][keep], 2)
+        end_tvl = np.round(weeks["end_tvl"][keep], 2)
+        return [
+            {
+                "week_start": str(week_start),
+                "tvl_slope_usd_per_day": float(slope),
+                "start_tvl": float(start),
+                "end_tvl": float(end)
+            }
+            for week_start, slope, start, end in zip(week_starts, slopes, start_tvl, end_tvl)
+        ]
+
+    def _latest_rolling_trends(self, days: np.ndarray, tvl: np.ndarray) -> Dict[str, Optional[float]]:
+        """Latest 7/30/90-day least-squares trends (USD per day); None when the series is shorter."""
+        if len(days) == 0:
+            return {f"{w}d": None for w in ROLLING_TREND_WINDOWS}
+        _, values, present = daily_series(days, tvl)
+        trends = rolling_trends(values, present)
+        return {f"{w}d": round(float(t[-1]), 2) if len(t) else None for w, t in trends.items()}
 
     def get_weekly_tvl_slopes(self) -> Dict[str, Any]:
         """
         Orchestrates the TVL analysis, fetching data and calculating weekly slopes.
         Returns the structured analysis results.
         """
-        data = self._fetch_data()
-        if data is None:
-            return {"error": "Failed to fetch data from DeFi Llama API.", "status": 503}
-        
-        tvl_info = self._find_tvl_data(data)
+        tvl_info = None
+        if self.streaming and self._series_location is not None:
+            tvl_info = self._stream_series(self._series_location)
+
         if tvl_info is None:
-            return {"error": "Could not locate TVL time-series data within the API response structure.", "status": 500}
+            data = self._fetch_data()
+            if data is None:
+                return {"error": "Failed to fetch data from DeFi Llama API.", "status": 503}
+
+            tvl_info = self._find_tvl_data(data)
+            if tvl_info is None:
+                self._series_location = None
+                return {"error": "Could not locate TVL time-series data within the API response structure.", "status": 500}
+            self._series_location = {k: tvl_info[k] for k in ('path', 'date_key', 'tvl_key')}
         
-        weekly_slopes = self._calculate_slopes(tvl_info)
+        days, tvl = self._to_arrays(tvl_info)
+        self.history.append(self.api_url, days, tvl)
+        weekly_slopes = self._weekly_slopes(days, tvl)
         
         if not weekly_slopes:
             return {"error": "Not enough data points found to calculate weekly slopes.", "status": 500}
@@ -171,8 +455,75 @@ class LlamaTvlAnalyzer:
         total_slope = sum(w['tvl_slope_usd_per_day'] for w in weekly_slopes)
         
         return {
-            "average_weekly_slope_usd_per_day": round(total_slope / total_weeks, 2) if total_weeks > 0 else 0.0
+            "average_weekly_slope_usd_per_day": round(total_slope / total_weeks, 2) if total_weeks > 0 else 0.0,
+            "rolling_trends_usd_per_day": self._latest_rolling_trends(days, tvl),
         }
 
 
+    def get_tvl_trends(self, horizons: Sequence[int] = DEFAULT_TREND_HORIZONS) -> Dict[str, Any]:
+        """
+        TVL trends over each horizon (in days) from the local daily history:
+        average, least-squares slope, change and drawdowns per horizon, plus
+        the weekly slopes and the daily series with its rolling averages over
+        the longest horizon. The history is only fetched from DeFi Llama if
+        nothing has been stored yet.
+        """
+        if self.history.last_row(self.api_url) is None:
+            result = self.get_weekly_tvl_slopes()
+            if 'error' in result:
+                return result
+        last = self.history.last_row(self.api_url)
+        if last is None:
+            return {"error": "No TVL history available.", "status": 503}
+
+        horizons = sorted(set(horizons))
+        longest = horizons[-1]
+        end_day = last['day']
+        window_start = end_day - longest + 1
+        # Rolling averages of the first charted day reach back another horizon.
+        series = self.history.load(self.api_url, window_start - longest)
+        days, tvl = series['day'], series['tvl']
+        latest = np.array([len(days) - 1])
+        chart = np.flatnonzero(days >= window_start)
+
+        horizon_stats: Dict[str, Any] = {}
+        rolling_averages: Dict[str, np.ndarray] = {}
+        for horizon in horizons:
+            sums = horizon_sums(series, latest, horizon)
+            start = int(sums['start'][0])
+            window = tvl[start:]
+            running_peak = np.maximum.accumulate(window)
+            horizon_stats[f"{horizon}d"] = {
+                "days": int(sums['cum_count'][0]),
+                "average_tvl": round(float(sums['cum_tvl'][0] / sums['cum_count'][0]), 2),
+                "slope_usd_per_day": round(float(_least_squares_slope(
+                    sums['cum_count'], sums['cum_x'], sums['cum_tvl'], sums['cum_xx'], sums['cum_x_tvl'])[0]), 2),
+                "change_pct": round(float((window[-1] / window[0] - 1) * 100), 2) if window[0] else None,
+                "max_drawdown_pct": round(float(np.min(window / np.where(running_peak > 0, running_peak, 1) - 1) * 100), 2),
+                "current_drawdown_pct": round(float((window[-1] / running_peak[-1] - 1) * 100), 2) if running_peak[-1] else 0.0,
+            }
+            chart_sums = horizon_sums(series, chart, horizon)
+            rolling_averages[f"{horizon}d"] = np.round(chart_sums['cum_tvl'] / chart_sums['cum_count'], 2)
+
+        return {
+            "as_of": _day_to_str(end_day),
+            "tvl": round(float(tvl[-1]), 2),
+            "horizons": horizon_stats,
+            "weekly_slopes": self._weekly_slopes(days[chart], tvl[chart]),
+            "daily": [
+                {
+                    "date": _day_to_str(days[i]),
+                    "tvl": round(float(tvl[i]), 2),
+                    "rolling_average_usd": {key: float(values[j]) for key, values in rolling_averages.items()},
+                }
+                for j, i in enumerate(chart)
+            ],
+        }
+
+    def get_tvl_trends_version(self) -> Optional[str]:
+        """Changes whenever a refresh writes to the stored history."""
+        last = self.history.last_row(self.api_url)
+        return f"{last['day']}:{last['cum_count']}:{last['tvl']}" if last else None
+
+
 llama_tvl_analyzer = LlamaTvlAnalyzer()
@@ -1,12 +1,98 @@
 import os
+import json
+import threading
 import requests
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 from datetime import datetime
+from ..http_client import http_client
+from ..local_store import LocalStore, local_store
 
 
 load_dotenv('.env')
 
+
+class VotingPowerAggregate:
+    """
+    Persisted running total of delegated voting power.
+
+    Holds the latest known balance of every delegate and one total per
+    indexed block. Applying the balances that changed up to a new block
+    adjusts the total by their differences, so a refresh costs as much as
+    the delta, and totals at earlier indexed blocks stay queryable.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS voting_power_delegate (
+        delegate TEXT PRIMARY KEY,
+        balance TEXT NOT NULL,
+        block_number INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS voting_power_total (
+        block_number INTEGER PRIMARY KEY,
+        total TEXT NOT NULL,
+        changed_delegates INTEGER NOT NULL
+    );
+    """
+    LOOKUP_CHUNK = 500
+
+    def __init__(self, store: LocalStore = local_store):
+        self.store = store
+        self.store.ensure_schema(self.SCHEMA)
+
+    def last_block(self) -> Optional[int]:
+        row = self.store.fetchone("SELECT MAX(block_number) AS block_number FROM voting_power_total")
+        return row["block_number"] if row else None
+
+    def total_at(self, block_number: Optional[int] = None) -> Optional[Tuple[int, Decimal]]:
+        """(block, total) of the latest indexed block at or before `block_number`, or None."""
+        if block_number is None:
+            row = self.store.fetchone("SELECT block_number, total FROM voting_power_total ORDER BY block_number DESC LIMIT 1")
+        else:
+            row = self.store.fetchone(
+                "SELECT block_number, total FROM voting_power_total WHERE block_number <= ? ORDER BY block_number DESC LIMIT 1",
+                (block_number,)
+            )
+        return (row["block_number"], Decimal(row["total"])) if row else None
+
+    def apply(self, block_number: int, balances: Dict[str, Decimal]) -> None:
+        """
+        Records the delegates' balances as of `block_number` and the total
+        that results. A block at or below the last indexed one is ignored, so
+        concurrent refreshes of the same delta do not count it twice.
+        """
+        with self.store.transaction() as conn:
+            row = conn.execute(
+                "SELECT block_number, total FROM voting_power_total ORDER BY block_number DESC LIMIT 1"
+            ).fetchone()
+            if row is not None and row["block_number"] >= block_number:
+                return
+            total = Decimal(row["total"]) if row else Decimal(0)
+
+            delegates = list(balances)
+            for i in range(0, len(delegates), self.LOOKUP_CHUNK):
+                chunk = delegates[i:i + self.LOOKUP_CHUNK]
+                previous = conn.execute(
+                    f"SELECT delegate, balance FROM voting_power_delegate WHERE delegate IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                total -= sum((Decimal(r["balance"]) for r in previous), Decimal(0))
+            total += sum(balances.values(), Decimal(0))
+
+            conn.executemany(
+                """
+                INSERT INTO voting_power_delegate (delegate, balance, block_number) VALUES (?, ?, ?)
+                ON CONFLICT(delegate) DO UPDATE SET balance = excluded.balance, block_number = excluded.block_number
+                """,
+                [(delegate, str(balance), block_number) for delegate, balance in balances.items()]
+            )
+            conn.execute(
+                "INSERT INTO voting_power_total (block_number, total, changed_delegates) VALUES (?, ?, ?)",
+                (block_number, str(total), len(balances))
+            )
+
 class SubgraphService:
     """
     Service class to interact with The Graph's subgraph endpoint, handling
@@ -15,10 +101,16 @@ class SubgraphService:
     """
     
     BATCH_SIZE = 1000
-    MAX_RECORDS = 5000 
-    MAX_BATCHES = 5
+    # Full scans split the id space into this many ranges scanned in parallel;
+    # 1 scans it sequentially.
+    SCAN_PARTITIONS = int(os.getenv('SUBGRAPH_SCAN_PARTITIONS', '4'))
+
+    # Fields read from delegateVotingPowerChanges when the subgraph has no
+    # delegates entity; the newest change of each delegate, by block and log
+    # index, is its balance.
+    CHANGE_FIELDS = "delegate newBalance blockNumber logIndex"
 
-    def __init__(self):
+    def __init__(self, aggregate: Optional[VotingPowerAggregate] = None):
         self.subgraph_id: Optional[str] = os.getenv('SUBGRAPH_ID')
         self.jwt_token: Optional[str] = os.getenv('THEGRAPH_JWT_TOKEN')
 
@@ -30,11 +122,15 @@ class SubgraphService:
             "Authorization": f"Bearer {self.jwt_token}",
             "Content-Type": "application/json"
         }
-        
+        self._entity_and_field: Optional[Tuple[str, str]] = None
+        self.aggregate = aggregate or VotingPowerAggregate()
+        self._refresh_lock = threading.Lock()
+        self._scan_pool = ThreadPoolExecutor(max_workers=max(1, self.SCAN_PARTITIONS), thread_name_prefix="subgraph-scan")
+
     def _execute_query(self, query: str) -> Dict[str, Any]:
         """Executes a GraphQL query against The Graph endpoint."""
         
-        response = requests.post(self.endpoint, json={'query': query}, headers=self.headers, timeout=30)
+        response = http_client.post(self.endpoint, json={'query': query}, headers=self.headers, timeout=30)
         response.raise_for_status()
         data = response.json()
 
@@ -44,8 +140,17 @@ class SubgraphService:
 
         return data
 
-    def _get_query_entity_and_field(self) -> tuple[str, str]:
-        """Performs introspection to determine the correct entity and voting power field."""
+    def _get_query_entity_and_field(self) -> Tuple[str, str]:
+        """
+        Performs introspection to determine the correct entity and voting power
+        field. The schema of a deployed subgraph does not change, so the result
+        is remembered for the life of the service.
+        """
+        if self._entity_and_field is None:
+            self._entity_and_field = self._introspect_entity_and_field()
+        return self._entity_and_field
+
+    def _introspect_entity_and_field(self) -> Tuple[str, str]:
         introspection_query = """
         {
           __schema {
@@ -67,50 +172,123 @@ class SubgraphService:
         else:
             raise Exception("No supported voting power entity ('delegates' or 'delegateVotingPowerChanges') found in subgraph schema.")
 
-    def _fetch_all_records(self, query_entity: str, field_name: str) -> List[Dict[str, Any]]:
-        """Handles pagination to fetch records up to MAX_RECORDS/MAX_BATCHES limits."""
-        all_records: List[Dict[str, Any]] = []
-        skip: int = 0
-        batch_count: int = 0
-
-        while batch_count < self.MAX_BATCHES and len(all_records) < self.MAX_RECORDS:
+    def _scan_range(self, query_entity: str, field_name: str, lower: str = "", upper: Optional[str] = None,
+                    filters: str = "", block: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Pages through the records with lower <= id < upper ("" and None: no
+        bound) in the subgraph's id order, using the last id seen as an id_gt
+        cursor. `filters` adds where-clauses and `block` pins the reads to
+        one block.
+        """
+        records: List[Dict[str, Any]] = []
+        cursor: Optional[str] = None
+        block_arg = f", block: {{number: {block}}}" if block is not None else ""
+        while True:
+            if cursor is not None:
+                where = f"id_gt: {json.dumps(cursor)}"
+            else:
+                where = f"id_gte: {json.dumps(lower)}"
+            if upper is not None:
+                where += f", id_lt: {json.dumps(upper)}"
+            if filters:
+                where += f", {filters}"
             current_query = f"""
             {{
-              {query_entity}(first: {self.BATCH_SIZE}, skip: {skip}) {{
+              {query_entity}(first: {self.BATCH_SIZE}, orderBy: id, orderDirection: asc, where: {{{where}}}{block_arg}) {{
                 id
                 {field_name}
               }}
             }}
             """
-            
             data = self._execute_query(current_query)
-            records = data.get('data', {}).get(query_entity, [])
+            batch = data.get('data', {}).get(query_entity, [])
+            records.extend(batch)
+            if len(batch) < self.BATCH_SIZE:
+                return records
+            cursor = batch[-1]['id']
+
+    @staticmethod
+    def _partition_bounds(partitions: int) -> List[Tuple[str, Optional[str]]]:
+        """
+        Splits the id space into `partitions` chained [lower, upper) ranges.
+        The ranges are compared by the subgraph itself and leave no gaps, so
+        every id falls in exactly one of them whatever its case or format;
+        the cuts on the first byte of 0x-prefixed lowercase hex only balance
+        the work between them.
+        """
+        cuts = [f"0x{(i * 256) // partitions:02x}" for i in range(1, partitions)]
+        lowers = [""] + cuts
+        uppers: List[Optional[str]] = cuts + [None]
+        return list(zip(lowers, uppers))
+
+    def _fetch_all_records(self, query_entity: str, field_name: str, partitions: Optional[int] = None,
+                           filters: str = "", block: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Fetches every record of the entity. With more than one partition the
+        id ranges are scanned concurrently and concatenated in id order.
+        """
+        partitions = min(max(1, partitions or self.SCAN_PARTITIONS), 256)
+        if partitions == 1:
+            return self._scan_range(query_entity, field_name, filters=filters, block=block)
+        scans = [
+            self._scan_pool.submit(self._scan_range, query_entity, field_name, lower, upper, filters, block)
+            for lower, upper in self._partition_bounds(partitions)
+        ]
+        return [record for scan in scans for record in scan.result()]
+
+    def _get_indexed_block(self) -> int:
+        data = self._execute_query("{ _meta { block { number } } }")
+        return int(data['data']['_meta']['block']['number'])
+
+    def _fetch_changed_balances(self, last_block: Optional[int], head: int) -> Dict[str, Decimal]:
+        """
+        Balances of the delegates that changed after `last_block` (all of
+        them when None), as of block `head`.
+        """
+        query_entity, field_name = self._get_query_entity_and_field()
+        if query_entity == 'delegates':
+            filters = f"_change_block: {{number_gte: {last_block + 1}}}" if last_block is not None else ""
+            records = self._fetch_all_records(query_entity, field_name, filters=filters, block=head)
+            return {record['id'].lower(): Decimal(record.get(field_name) or 0) for record in records}
 
-            if not records:
-                break
-            
-            all_records.extend(records)
-            skip += self.BATCH_SIZE
-            batch_count += 1
-            
-            if len(all_records) >= self.MAX_RECORDS or batch_count >= self.MAX_BATCHES:
-                break
+        filters = f'blockNumber_lte: "{head}"'
+        if last_block is not None:
+            filters += f', blockNumber_gt: "{last_block}"'
+        records = self._fetch_all_records(query_entity, self.CHANGE_FIELDS, filters=filters)
+        latest: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+        for record in records:
+            delegate = record['delegate'].lower()
+            position = (int(record['blockNumber']), int(record.get('logIndex') or 0))
+            current = latest.get(delegate)
+            if current is None or position > current[0]:
+                latest[delegate] = (position, record)
+        return {delegate: Decimal(record.get(field_name) or 0) for delegate, (_, record) in latest.items()}
 
-        return all_records
+    def refresh_voting_power(self) -> int:
+        """
+        Brings the aggregate up to the subgraph's indexed block and returns
+        that block. Only entities changed since the last indexed block are
+        downloaded.
+        """
+        with self._refresh_lock:
+            head = self._get_indexed_block()
+            last_block = self.aggregate.last_block()
+            if last_block is None or head > last_block:
+                self.aggregate.apply(head, self._fetch_changed_balances(last_block, head))
+            return head
 
     def get_total_voting_power(self) -> Dict[str, Any]:
         """
         Calculates the total delegated voting power from the subgraph.
-        Returns a dictionary containing only the total power on success, 
-        or an error payload dictionary on failure.
+        Returns a dictionary containing the total power and the block it was
+        indexed at on success, or an error payload dictionary on failure.
         """
         try:
-            query_entity, field_name = self._get_query_entity_and_field()
-            records = self._fetch_all_records(query_entity, field_name)
-            
-            total_voting_power: float = sum(float(record.get(field_name, 0)) for record in records)
+            self.refresh_voting_power()
+            block_number, total = self.aggregate.total_at()
             return {
-                "totalDelegatedVotingPower": total_voting_power,
+                "totalDelegatedVotingPower": float(total),
+                "block": block_number,
             }
 
         except requests.exceptions.HTTPError as e:
@@ -119,12 +297,22 @@ class SubgraphService:
         except Exception as e:
             return {"error": f"Failed to retrieve voting power data: {str(e)}", "status": 500}
 
+    def get_total_voting_power_at(self, block_number: int) -> Dict[str, Any]:
+        """Total delegated voting power at the latest indexed block at or before `block_number`."""
+        indexed = self.aggregate.total_at(block_number)
+        if indexed is None:
+            return {"error": f"No voting power indexed at or before block {block_number}", "status": 404}
+        return {"totalDelegatedVotingPower": float(indexed[1]), "block": indexed[0]}
+
 
 try:
     subgraph_service = SubgraphService()
 except ValueError as e:
-    
+    _init_error = str(e)
+
     class FailedSubgraphService:
         def get_total_voting_power(self) -> Dict[str, Any]:
-            return {"error": f"Subgraph service initialization failed: {str(e)}", "status": 500}
+            return {"error": f"Subgraph service initialization failed: {_init_error}", "status": 500}
+        def get_total_voting_power_at(self, block_number: int) -> Dict[str, Any]:
+            return {"error": f"Subgraph service initialization failed: {_init_error}", "status": 500}
     subgraph_service = FailedSubgraphService()
@@ -0,0 +1,86 @@
+import threading
+import requests
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class CappedRetry(Retry):
+    """Retry policy that honours Retry-After but never sleeps longer than RETRY_AFTER_CAP_SECONDS."""
+
+    RETRY_AFTER_CAP_SECONDS: float = 30.0
+
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.RETRY_AFTER_CAP_SECONDS)
+
+
+class HttpClient:
+    """
+    Shared HTTP transport for the backend's upstream services.
+
+    Keeps one pooled, keep-alive requests.Session per scheme+host, so repeated
+    calls to the same API reuse TCP/TLS connections. Every session retries
+    connection errors and 429/5xx responses with jittered exponential backoff,
+    honouring Retry-After. Callers keep using the requests API and exception
+    types; after the last attempt the final response is returned as-is for
+    the caller's raise_for_status().
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    # GraphQL and JSON-RPC reads go over POST, so POST is retried as well.
+    RETRY_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "POST"})
+
+    def __init__(self, max_retries: int = 2, backoff_factor: float = 0.5,
+                 backoff_jitter: float = 0.5, backoff_max: float = 10.0, pool_maxsize: int = 10):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_jitter = backoff_jitter
+        self.backoff_max = backoff_max
+        self.pool_maxsize = pool_maxsize
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def _retry_policy(self) -> Retry:
+        return CappedRetry(
+            total=self.max_retries,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=self.RETRY_METHODS,
+            backoff_factor=self.backoff_factor,
+            backoff_jitter=self.backoff_jitter,
+            backoff_max=self.backoff_max,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+
+    def session_for(self, url: str) -> requests.Session:
+        """Returns the pooled session for the URL's scheme and host."""
+        parts = urlsplit(url)
+        key = f"{parts.scheme}://{parts.netloc}"
+        session = self._sessions.get(key)
+        if session is not None:
+            return session
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize,
+                                      max_retries=self._retry_policy())
+                session.mount(f"{key}/", adapter)
+                self._sessions[key] = session
+        return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        return self.session_for(url).request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+
+http_client = HttpClient()
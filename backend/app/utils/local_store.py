@@ -0,0 +1,89 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, List, Optional
+
+
+DEFAULT_LOCAL_STORE_PATH: str = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'instance', 'prophet_cache.sqlite3'
+)
+
+
+class LocalStore:
+    """
+    SQLite file holding the backend's own caches and mirrors (forum posts,
+    ledgers, price history, ...). It lives next to the app rather than in the
+    Postgres database, whose tables are owned by the substreams sink.
+
+    Connections are opened per thread and the file runs in WAL mode, so it is
+    safe to share between threads and gunicorn worker processes. Nothing is
+    opened until the first query: caches register their tables when they
+    are constructed (usually at import), and the file and tables are
+    created on first use.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path: str = path or os.getenv('PROPHET_CACHE_DB', DEFAULT_LOCAL_STORE_PATH)
+        self._local = threading.local()
+        self._schemas: List[str] = []
+        self._applied_schemas = 0
+        self._schema_lock = threading.Lock()
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        if self._applied_schemas < len(self._schemas) and not conn.in_transaction:
+            self._apply_schemas(conn)
+        return conn
+
+    def _apply_schemas(self, conn: sqlite3.Connection) -> None:
+        with self._schema_lock:
+            for ddl in self._schemas[self._applied_schemas:]:
+                conn.executescript(ddl)
+            self._applied_schemas = len(self._schemas)
+
+    def ensure_schema(self, ddl: str) -> None:
+        """
+        Registers idempotent DDL (CREATE ... IF NOT EXISTS) for a cache's
+        tables. It runs before the store's next query.
+        """
+        with self._schema_lock:
+            self._schemas.append(ddl)
+
+    def execute(self, sql: str, params: Iterable[Any] = ()) -> sqlite3.Cursor:
+        return self.connection().execute(sql, tuple(params))
+
+    def executemany(self, sql: str, rows: Iterable[Iterable[Any]]) -> sqlite3.Cursor:
+        return self.connection().executemany(sql, rows)
+
+    def fetchone(self, sql: str, params: Iterable[Any] = ()) -> Optional[sqlite3.Row]:
+        return self.execute(sql, params).fetchone()
+
+    def fetchall(self, sql: str, params: Iterable[Any] = ()) -> List[sqlite3.Row]:
+        return self.execute(sql, params).fetchall()
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction that takes the database lock up front."""
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+
+
+local_store = LocalStore()
@@ -1,16 +1,263 @@
 import os
+import re
+import json
+import time
+import threading
 import requests
 import google.generativeai as genai
-from typing import List, Dict, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Any
+
+from .local_store import LocalStore, local_store
+from .http_client import http_client
+
+
+FORUM_BASE_URL = "https://gov.uniswap.org"
+FORUM_TOPIC_PREFIX = f"{FORUM_BASE_URL}/t/"
+
+# Markdown link targets are preferred over bare URLs: they are what the
+# author deliberately linked, while bare matches may be quoted references.
+MARKDOWN_FORUM_LINK_PATTERN = re.compile(
+    r'\[[^\]]*\]\(\s*<?(https?://gov\.uniswap\.org/t/[^\s)>]+)', re.IGNORECASE
+)
+BARE_FORUM_URL_PATTERN = re.compile(
+    r'https?://gov\.uniswap\.org/t/[^\s<>"\'()\[\]{}|`]+', re.IGNORECASE
+)
+TRAILING_URL_PUNCTUATION = '.,;:!?*_'
+
+
+def extract_forum_url(description: Optional[str]) -> Optional[str]:
+    """
+    Deterministically finds the forum topic linked from a proposal
+    description, or None if there is no such link.
+    """
+    if not description:
+        return None
+    # Markdown escapes such as topic\_name would otherwise end up in the URL.
+    text = description.replace('\\', '')
+    match = MARKDOWN_FORUM_LINK_PATTERN.search(text) or BARE_FORUM_URL_PATTERN.search(text)
+    if not match:
+        return None
+    url = (match.group(1) if match.groups() else match.group(0)).rstrip(TRAILING_URL_PUNCTUATION)
+    return normalize_topic_url(url)
+
+
+# Proposal states after which the forum thread is effectively archived.
+FINAL_PROPOSAL_STATES = {"CANCELED", "CANCELLED", "DEFEATED", "EXPIRED", "EXECUTED"}
+
+
+def normalize_topic_url(url: str) -> str:
+    """
+    Canonical form of a forum topic URL, used as the cache key: no query or
+    fragment, no trailing slash, no post-number suffix, lower-case host.
+    """
+    url = url.strip().split('#')[0].split('?')[0].rstrip('/')
+    if url.endswith('.json'):
+        url = url[:-len('.json')]
+    match = re.match(r'^https?://gov\.uniswap\.org/t/(.+)$', url, re.IGNORECASE)
+    if not match:
+        return url
+    parts = match.group(1).split('/')
+    # /t/<slug>/<topic_id>/<post_number> and /t/<topic_id>/<post_number>
+    if len(parts) >= 3 and parts[1].isdigit() and parts[2].isdigit():
+        parts = parts[:2]
+    elif len(parts) == 2 and parts[0].isdigit() and parts[1].isdigit():
+        parts = parts[:1]
+    return FORUM_TOPIC_PREFIX + '/'.join(parts)
+
+
+class _MemoryLru:
+    """Bounded, thread-safe in-process LRU kept in front of a SQLite table."""
+
+    MISSING = object()
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        """The value (which may be None), or _MemoryLru.MISSING."""
+        with self._lock:
+            if key not in self._entries:
+                return self.MISSING
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class OffChainDiscussionCache:
+    """
+    Persistent cache of filtered forum posts keyed by normalized topic URL.
+
+    Entries carry the forum's ETag / Last-Modified validators so expired
+    entries can be revalidated cheaply, and a small in-process LRU of parsed
+    entries sits in front of the SQLite table so hot hits skip the disk.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS offchain_discussion_cache (
+        url TEXT PRIMARY KEY,
+        posts TEXT,
+        etag TEXT,
+        last_modified TEXT,
+        checked_at REAL NOT NULL,
+        failed_at REAL
+    );
+    """
+    MEMORY_ENTRIES = 256
+
+    def __init__(self, store: LocalStore = local_store):
+        self.store = store
+        self.store.ensure_schema(self.SCHEMA)
+        self._memory = _MemoryLru(self.MEMORY_ENTRIES)
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        entry = self._memory.get(url)
+        if entry is not _MemoryLru.MISSING:
+            return entry
+
+        row = self.store.fetchone(
+            "SELECT posts, etag, last_modified, checked_at, failed_at FROM offchain_discussion_cache WHERE url = ?",
+            (url,)
+        )
+        if row is None:
+            return None
+        entry = {
+            "posts": json.loads(row["posts"]) if row["posts"] is not None else None,
+            "etag": row["etag"],
+            "last_modified": row["last_modified"],
+            "checked_at": row["checked_at"],
+            "failed_at": row["failed_at"],
+        }
+        self._memory.put(url, entry)
+        return entry
+
+    def put(self, url: str, posts: Optional[List[Dict]], etag: Optional[str],
+            last_modified: Optional[str], checked_at: float, failed_at: Optional[float] = None) -> Dict[str, Any]:
+        self.store.execute(
+            """
+            INSERT INTO offchain_discussion_cache (url, posts, etag, last_modified, checked_at, failed_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(url) DO UPDATE SET
+                posts = excluded.posts, etag = excluded.etag, last_modified = excluded.last_modified,
+                checked_at = excluded.checked_at, failed_at = excluded.failed_at
+            """,
+            (url, json.dumps(posts) if posts is not None else None, etag, last_modified, checked_at, failed_at)
+        )
+        entry = {"posts": posts, "etag": etag, "last_modified": last_modified,
+                 "checked_at": checked_at, "failed_at": failed_at}
+        self._memory.put(url, entry)
+        return entry
+
+
+class ForumUrlMemo:
+    """Persisted proposal_id -> forum URL resolutions, including misses (url NULL)."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS proposal_forum_url (
+        proposal_id TEXT PRIMARY KEY,
+        url TEXT,
+        source TEXT NOT NULL,
+        resolved_at REAL NOT NULL
+    );
+    """
+    _MISSING = _MemoryLru.MISSING
+    MEMORY_ENTRIES = 4096
+
+    def __init__(self, store: LocalStore = local_store):
+        self.store = store
+        self.store.ensure_schema(self.SCHEMA)
+        self._memory = _MemoryLru(self.MEMORY_ENTRIES)
+
+    def get(self, proposal_id: str):
+        """Returns the memoized URL (possibly None), or ForumUrlMemo._MISSING."""
+        url = self._memory.get(proposal_id)
+        if url is not self._MISSING:
+            return url
+        row = self.store.fetchone("SELECT url FROM proposal_forum_url WHERE proposal_id = ?", (proposal_id,))
+        if row is None:
+            return self._MISSING
+        self._memory.put(proposal_id, row["url"])
+        return row["url"]
+
+    def put(self, proposal_id: str, url: Optional[str], source: str) -> None:
+        self.store.execute(
+            """
+            INSERT INTO proposal_forum_url (proposal_id, url, source, resolved_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(proposal_id) DO UPDATE SET
+                url = excluded.url, source = excluded.source, resolved_at = excluded.resolved_at
+            """,
+            (proposal_id, url, source, time.time())
+        )
+        self._memory.put(proposal_id, url)
+
 
 class OffChainDataService:
-    def __init__(self, api_key: str):
+    REQUEST_TIMEOUT_SECONDS = 15
+    # How long a cached thread is served before revalidating with the forum.
+    OPEN_PROPOSAL_TTL_SECONDS = 5 * 60
+    FINAL_PROPOSAL_TTL_SECONDS = 7 * 24 * 3600
+    # After a failed fetch the forum is not contacted again for this long;
+    # requests are answered from the cache (or with no discussion) instead.
+    FAILURE_BACKOFF_SECONDS = 2 * 60
+    # Discourse inlines only the first page of a topic's posts; the rest are
+    # fetched by id in batches of this size, at most this many at once.
+    POSTS_PER_REQUEST = 20
+    MAX_CONCURRENT_POST_REQUESTS = 4
+
+    def __init__(self, api_key: str, cache: Optional[OffChainDiscussionCache] = None,
+                 url_memo: Optional[ForumUrlMemo] = None):
         if not api_key:
             raise ValueError("Gemini API key is required.")
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel('gemini-2.5-pro')
+        self.cache = cache or OffChainDiscussionCache()
+        self.url_memo = url_memo or ForumUrlMemo()
+        self._forum_unavailable_until: float = 0.0
 
-    def _extract_url_from_description(self, description: str) -> Optional[str]:
+        self.session = http_client.session_for(FORUM_BASE_URL)
+        self._post_fetch_pool = ThreadPoolExecutor(
+            max_workers=self.MAX_CONCURRENT_POST_REQUESTS, thread_name_prefix="forum-posts"
+        )
+
+    def resolve_forum_url(self, description: str, proposal_id: Optional[str] = None) -> Optional[str]:
+        """
+        Resolves the forum URL for a description: memo first, then the
+        deterministic extractor, and the LLM only when the extractor finds
+        nothing. Resolutions are memoized per proposal, except LLM failures,
+        which are retried on the next request.
+        """
+        if proposal_id is not None:
+            memoized = self.url_memo.get(proposal_id)
+            if memoized is not ForumUrlMemo._MISSING:
+                return memoized
+
+        url = extract_forum_url(description)
+        source = "regex"
+        if url is None:
+            try:
+                url = self._extract_url_with_llm(description)
+            except Exception:
+                return None
+            source = "llm"
+
+        if proposal_id is not None:
+            self.url_memo.put(proposal_id, url, source)
+        return url
+
+    def _extract_url_with_llm(self, description: str) -> Optional[str]:
+        """Asks the LLM for the forum URL. Raises if the model call fails."""
         prompt = f"""
         Extract the complete Uniswap governance forum URL from the following text.
         The URL starts with 'https://gov.uniswap.org/t/'.
@@ -19,22 +266,75 @@ class OffChainDataService:
         Text:
         {description}
         """
-        try:
-            response = self.model.generate_content(prompt)
-            url = response.text.strip()
-            if url.startswith("https://gov.uniswap.org/t/"):
-                return url
-        except Exception:
-            return None
+        response = self.model.generate_content(prompt)
+        url = response.text.strip()
+        if url.startswith(FORUM_TOPIC_PREFIX):
+            return normalize_topic_url(url)
         return None
 
-    def _fetch_discussion_json(self, base_url: str) -> Optional[Dict]:
+    def _fetch_post_batch(self, topic_id: int, post_ids: List[int]) -> List[Dict[str, Any]]:
+        response = self.session.get(
+            f"{FORUM_BASE_URL}/t/{topic_id}/posts.json",
+            params=[("post_ids[]", post_id) for post_id in post_ids],
+            timeout=self.REQUEST_TIMEOUT_SECONDS,
+        )
+        response.raise_for_status()
+        return response.json().get("post_stream", {}).get("posts", [])
+
+    def fetch_posts_by_id(self, topic_id: int, post_ids: List[int]) -> List[Dict[str, Any]]:
+        """
+        Fetches the given posts of a topic in concurrent batches, capped at
+        MAX_CONCURRENT_POST_REQUESTS in flight. Raises requests.RequestException
+        if any batch fails.
+        """
+        batches = [post_ids[i:i + self.POSTS_PER_REQUEST] for i in range(0, len(post_ids), self.POSTS_PER_REQUEST)]
+        futures = [self._post_fetch_pool.submit(self._fetch_post_batch, topic_id, batch) for batch in batches]
+        posts: List[Dict[str, Any]] = []
+        for future in futures:
+            posts.extend(future.result())
+        return posts
+
+    def _complete_post_stream(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Fills post_stream.posts with every post listed in post_stream.stream, in stream order."""
+        post_stream = data.get("post_stream", {})
+        inline_posts = {p["id"]: p for p in post_stream.get("posts", []) if isinstance(p, dict) and "id" in p}
+        stream_ids = post_stream.get("stream") or []
+        missing_ids = [post_id for post_id in stream_ids if post_id not in inline_posts]
+        if not missing_ids:
+            return data
+        fetched = {p["id"]: p for p in self.fetch_posts_by_id(data["id"], missing_ids)}
+        all_posts = {**inline_posts, **fetched}
+        post_stream["posts"] = [all_posts[post_id] for post_id in stream_ids if post_id in all_posts]
+        return data
+
+    def _fetch_discussion_json(self, base_url: str, etag: Optional[str] = None,
+                               last_modified: Optional[str] = None, complete: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Conditionally fetches a topic's JSON. Returns None on failure, otherwise
+        {"not_modified": bool, "data": dict | None, "etag": str, "last_modified": str}.
+        With `complete`, posts beyond the first page are fetched as well.
+        """
         json_url = f"{base_url.split('?')[0].rstrip('/')}.json"
+        headers: Dict[str, str] = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
         try:
-            response = requests.get(json_url, timeout=15)
+            response = self.session.get(json_url, headers=headers, timeout=self.REQUEST_TIMEOUT_SECONDS)
+            if response.status_code == 304:
+                return {"not_modified": True, "data": None, "etag": etag, "last_modified": last_modified}
             response.raise_for_status()
-            return response.json()
-        except (requests.RequestException, ValueError):
+            data = response.json()
+            if complete:
+                data = self._complete_post_stream(data)
+            return {
+                "not_modified": False,
+                "data": data,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
+        except (requests.RequestException, ValueError, KeyError):
             return None
 
     def _filter_discussion_posts(self, data: Dict) -> List[Dict]:
@@ -51,16 +351,51 @@ class OffChainDataService:
                 })
         return filtered_posts
 
-    def get_filtered_discussion(self, description: str) -> Optional[List[Dict]]:
-        base_url = self._extract_url_from_description(description)
-        if not base_url:
-            return None
+    def _ttl_for_state(self, state: Optional[str]) -> int:
+        if state and state.upper() in FINAL_PROPOSAL_STATES:
+            return self.FINAL_PROPOSAL_TTL_SECONDS
+        return self.OPEN_PROPOSAL_TTL_SECONDS
+
+    def _get_discussion_for_url(self, base_url: str, state: Optional[str] = None) -> Optional[List[Dict]]:
+        """Cache-first lookup of a topic's filtered posts, revalidating when stale."""
+        url = normalize_topic_url(base_url)
+        now = time.time()
+        entry = self.cache.get(url)
+
+        if entry is not None:
+            if entry["failed_at"] is not None and now - entry["failed_at"] < self.FAILURE_BACKOFF_SECONDS:
+                return entry["posts"]
+            if now - entry["checked_at"] < self._ttl_for_state(state):
+                return entry["posts"]
+        if now < self._forum_unavailable_until:
+            return entry["posts"] if entry else None
+
+        result = self._fetch_discussion_json(
+            url,
+            etag=entry["etag"] if entry else None,
+            last_modified=entry["last_modified"] if entry else None,
+        )
+        if result is None:
+            self._forum_unavailable_until = now + self.FAILURE_BACKOFF_SECONDS
+            stale_posts = entry["posts"] if entry else None
+            self.cache.put(url, stale_posts, entry["etag"] if entry else None,
+                           entry["last_modified"] if entry else None,
+                           checked_at=entry["checked_at"] if entry else 0.0, failed_at=now)
+            return stale_posts
 
-        json_data = self._fetch_discussion_json(base_url)
-        if not json_data:
+        if result["not_modified"] and entry is not None:
+            posts = entry["posts"]
+        else:
+            posts = self._filter_discussion_posts(result["data"])
+        self.cache.put(url, posts, result["etag"], result["last_modified"], checked_at=now)
+        return posts
+
+    def get_filtered_discussion(self, description: str, state: Optional[str] = None,
+                                proposal_id: Optional[str] = None) -> Optional[List[Dict]]:
+        base_url = self.resolve_forum_url(description, proposal_id)
+        if not base_url:
             return None
 
-        filtered_posts = self._filter_discussion_posts(json_data)
-        return filtered_posts
+        return self._get_discussion_for_url(base_url, state)
 
 offchain_service = OffChainDataService(api_key=os.getenv('GEMINI_API_KEY'))
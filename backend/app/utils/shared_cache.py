@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from .local_store import LocalStore, local_store
+
+logger = logging.getLogger(__name__)
+
+
+class SharedCache:
+    """
+    JSON values shared by every thread and gunicorn worker through the local
+    SQLite store, with single-flight refresh.
+
+    When an entry expires, the first caller takes a lease on its key and runs
+    the refresh; other callers keep serving the previous value meanwhile, or,
+    when there is none yet, wait for the lease holder to finish. The holder
+    renews the lease while the refresh runs, so only a lease that has not
+    been renewed for its lease period (e.g. a killed worker) is treated as
+    abandoned and can be taken over.
+
+    A failed refresh keeps serving the previous value when there is one, and
+    the lease is held for FAILURE_BACKOFF_SECONDS so the next attempt is not
+    made on every call.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS shared_cache (
+        key TEXT PRIMARY KEY,
+        value TEXT,
+        updated_at REAL NOT NULL DEFAULT 0,
+        lease_owner TEXT,
+        lease_expires REAL NOT NULL DEFAULT 0
+    );
+    """
+    LEASE_SECONDS = 120.0
+    FAILURE_BACKOFF_SECONDS = 60.0
+    POLL_SECONDS = 0.2
+
+    def __init__(self, store: LocalStore = local_store):
+        self.store = store
+        self.store.ensure_schema(self.SCHEMA)
+        self._owner_prefix = uuid.uuid4().hex
+
+    def _owner(self) -> str:
+        return f"{self._owner_prefix}:{os.getpid()}:{threading.get_ident()}"
+
+    def get_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """The stored value and when it was written, or None if there is none."""
+        row = self.store.fetchone("SELECT value, updated_at FROM shared_cache WHERE key = ?", (key,))
+        if row is None or row["value"] is None:
+            return None
+        return {"value": json.loads(row["value"]), "updated_at": row["updated_at"]}
+
+    def set(self, key: str, value: Any) -> None:
+        self.store.execute(
+            """
+            INSERT INTO shared_cache (key, value, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+            """,
+            (key, json.dumps(value), time.time())
+        )
+
+    def _acquire_lease(self, key: str, owner: str, lease_seconds: float) -> bool:
+        now = time.time()
+        with self.store.transaction() as conn:
+            conn.execute("INSERT OR IGNORE INTO shared_cache (key) VALUES (?)", (key,))
+            cursor = conn.execute(
+                "UPDATE shared_cache SET lease_owner = ?, lease_expires = ? WHERE key = ? AND lease_expires < ?",
+                (owner, now + lease_seconds, key, now)
+            )
+            return cursor.rowcount == 1
+
+    def _extend_lease(self, key: str, owner: str, seconds: float) -> bool:
+        cursor = self.store.execute(
+            "UPDATE shared_cache SET lease_expires = ? WHERE key = ? AND lease_owner = ?",
+            (time.time() + seconds, key, owner)
+        )
+        return cursor.rowcount == 1
+
+    def _release_lease(self, key: str, owner: str) -> None:
+        self.store.execute(
+            "UPDATE shared_cache SET lease_owner = NULL, lease_expires = 0 WHERE key = ? AND lease_owner = ?",
+            (key, owner)
+        )
+
+    @contextmanager
+    def _renewing_lease(self, key: str, owner: str, lease_seconds: float) -> Iterator[None]:
+        """Keeps extending the lease from a helper thread while the block runs."""
+        stop = threading.Event()
+
+        def renew():
+            while not stop.wait(lease_seconds / 3):
+                if not self._extend_lease(key, owner, lease_seconds):
+                    return
+
+        renewer = threading.Thread(target=renew, name=f"lease-renewal:{key}", daemon=True)
+        renewer.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            renewer.join()
+
+    def get_or_refresh(self, key: str, max_age_seconds: float, refresh: Callable[[], Any],
+                       lease_seconds: Optional[float] = None) -> Any:
+        """
+        Returns the cached value if it is younger than `max_age_seconds`,
+        otherwise refreshes it under the key's lease (renewed every third of
+        `lease_seconds`, LEASE_SECONDS by default). If `refresh` raises, the
+        previous value is returned when there is one; otherwise the exception
+        propagates to the caller that ran it. Nothing is stored on failure.
+        """
+        lease_seconds = lease_seconds or self.LEASE_SECONDS
+        owner = self._owner()
+        while True:
+            entry = self.get_entry(key)
+            if entry is not None and time.time() - entry["updated_at"] < max_age_seconds:
+                return entry["value"]
+
+            if self._acquire_lease(key, owner, lease_seconds):
+                try:
+                    with self._renewing_lease(key, owner, lease_seconds):
+                        value = refresh()
+                    self.set(key, value)
+                except Exception as e:
+                    if entry is None:
+                        self._release_lease(key, owner)
+                        raise
+                    logger.warning(f"Refreshing shared cache key {key} failed, serving the previous value: {e}")
+                    self._extend_lease(key, owner, self.FAILURE_BACKOFF_SECONDS)
+                    return entry["value"]
+                self._release_lease(key, owner)
+                return value
+
+            if entry is not None:
+                return entry["value"]
+            time.sleep(self.POLL_SECONDS)
+
+
+shared_cache = SharedCache()
@@ -0,0 +1,84 @@
+"""
+Benchmark: deterministic forum-URL extraction vs. the Gemini fallback.
+
+Runs both extractors over every proposal description in the database and
+reports hit rate, agreement and per-call latency.
+
+    cd backend
+    python -m benchmarks.forum_url_extraction            # regex only
+    python -m benchmarks.forum_url_extraction --llm      # also query Gemini
+"""
+import argparse
+import os
+import statistics
+import time
+from typing import List, Optional
+
+from app import create_app
+from app.db.models import Proposal
+from app.utils.offchain import extract_forum_url, offchain_service
+
+
+def _summarize(label: str, timings: List[float], hits: int, total: int) -> None:
+    if not timings:
+        return
+    print(f"{label}:")
+    print(f"  hit rate      {hits}/{total} ({hits / total * 100:.1f}%)")
+    print(f"  mean latency  {statistics.mean(timings) * 1e3:.3f} ms")
+    print(f"  p95 latency   {sorted(timings)[int(len(timings) * 0.95) - 1] * 1e3:.3f} ms")
+    print(f"  total         {sum(timings):.3f} s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--llm', action='store_true', help='also run the Gemini extractor on every description')
+    args = parser.parse_args()
+
+    app = create_app(os.getenv('FLASK_CONFIG') or 'default')
+    with app.app_context():
+        descriptions = [d for (d,) in Proposal.query.with_entities(Proposal.description)]
+
+    total = len(descriptions)
+    if not total:
+        print("No proposals in the database.")
+        return
+    print(f"{total} proposal descriptions\n")
+
+    regex_results: List[Optional[str]] = []
+    regex_timings: List[float] = []
+    for description in descriptions:
+        start = time.perf_counter()
+        regex_results.append(extract_forum_url(description))
+        regex_timings.append(time.perf_counter() - start)
+    _summarize("regex extractor", regex_timings, sum(r is not None for r in regex_results), total)
+
+    if not args.llm:
+        return
+
+    llm_results: List[Optional[str]] = []
+    llm_timings: List[float] = []
+    llm_errors = 0
+    for description in descriptions:
+        start = time.perf_counter()
+        try:
+            llm_results.append(offchain_service._extract_url_with_llm(description))
+        except Exception:
+            llm_results.append(None)
+            llm_errors += 1
+        llm_timings.append(time.perf_counter() - start)
+    print()
+    _summarize("gemini extractor", llm_timings, sum(r is not None for r in llm_results), total)
+    print(f"  errors        {llm_errors}")
+
+    both = [(r, l) for r, l in zip(regex_results, llm_results) if r is not None and l is not None]
+    agree = sum(r == l for r, l in both)
+    llm_only = sum(r is None and l is not None for r, l in zip(regex_results, llm_results))
+    print()
+    print(f"agreement where both found a URL  {agree}/{len(both)}")
+    print(f"found only by gemini (fallback)   {llm_only}")
+    if regex_timings and llm_timings:
+        print(f"speedup (mean)                    {statistics.mean(llm_timings) / max(statistics.mean(regex_timings), 1e-9):,.1f}x")
+
+
+if __name__ == '__main__':
+    main()
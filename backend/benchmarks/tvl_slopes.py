@@ -0,0 +1,121 @@
+"""
+Benchmark: vectorized TVL slope engine vs. the previous per-point implementation.
+
+Generates synthetic multi-year daily TVL series in the date formats DeFi
+Llama uses and times weekly slope calculation (plus the rolling 7/30/90-day
+trends of the new engine) on each.
+
+    cd backend
+    python -m benchmarks.tvl_slopes
+    python -m benchmarks.tvl_slopes --years 3 10 --repeat 5
+"""
+import argparse
+import random
+import statistics
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.utils.foundation_data.tvl_slope import LlamaTvlAnalyzer
+
+
+LEGACY_FORMATS = [
+    "%Y-%m-%d",
+    "%Y-%m-%dT%H:%M:%S.%fZ",
+    "%Y-%m-%dT%H:%M:%SZ",
+    "%Y-%m-%d %H:%M:%S",
+]
+
+
+def _legacy_parse_date(date_str: str):
+    for fmt in LEGACY_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt).date()
+        except ValueError:
+            continue
+    return datetime.utcfromtimestamp(int(float(date_str))).date()
+
+
+def legacy_calculate_slopes(tvl_info: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The per-point, two-point-slope implementation the engine replaced."""
+    parsed = []
+    for entry in tvl_info['data']:
+        try:
+            date = _legacy_parse_date(str(entry[tvl_info['date_key']]))
+            tvl = float(entry[tvl_info['tvl_key']]) if entry[tvl_info['tvl_key']] is not None else 0.0
+            parsed.append((date, tvl))
+        except (ValueError, KeyError, TypeError):
+            continue
+    if len(parsed) < 7:
+        return []
+    parsed.sort(key=lambda x: x[0])
+    weekly = defaultdict(list)
+    for date, tvl in parsed:
+        weekly[date - timedelta(days=date.weekday())].append((date, tvl))
+    slopes = []
+    for week_start, points in sorted(weekly.items()):
+        if len(points) < 2:
+            continue
+        (first_date, first_tvl), (last_date, last_tvl) = points[0], points[-1]
+        days_diff = (last_date - first_date).days
+        slopes.append({
+            "week_start": week_start.strftime("%Y-%m-%d"),
+            "tvl_slope_usd_per_day": round((last_tvl - first_tvl) / days_diff if days_diff > 0 else 0.0, 2),
+        })
+    return slopes
+
+
+def make_series(years: int, date_format: str) -> Dict[str, Any]:
+    random.seed(years)
+    start = datetime(2015, 1, 1, tzinfo=timezone.utc)
+    tvl = 1e9
+    data = []
+    for day in range(365 * years):
+        date = start + timedelta(days=day)
+        tvl = max(0.0, tvl * (1 + random.gauss(0.0005, 0.02)))
+        if date_format == 'epoch':
+            value: Any = int(date.timestamp())
+        else:
+            value = date.strftime(date_format)
+        data.append({"date": value, "totalLiquidityUSD": tvl})
+    return {"path": "tvl", "data": data, "date_key": "date", "tvl_key": "totalLiquidityUSD", "length": len(data)}
+
+
+def _time(func: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=int, nargs='+', default=[3, 10, 30], help='series lengths in years')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement (median is reported)')
+    args = parser.parse_args()
+
+    analyzer = LlamaTvlAnalyzer()
+
+    def engine(tvl_info: Dict[str, Any]) -> List[Dict[str, Any]]:
+        days, tvl = analyzer._to_arrays(tvl_info)
+        slopes = analyzer._weekly_slopes(days, tvl)
+        analyzer._latest_rolling_trends(days, tvl)
+        return slopes
+
+    print(f"{'series':<28}{'points':>8}{'legacy ms':>12}{'engine ms':>12}{'speedup':>10}{'weeks':>8}")
+    for years in args.years:
+        for label, date_format in (('iso date', '%Y-%m-%d'), ('iso datetime', '%Y-%m-%dT%H:%M:%SZ'), ('epoch seconds', 'epoch')):
+            tvl_info = make_series(years, date_format)
+            legacy_time, legacy = _time(lambda: legacy_calculate_slopes(tvl_info), args.repeat)
+            engine_time, result = _time(lambda: engine(tvl_info), args.repeat)
+            weeks = f"{len(result)}" if len(result) == len(legacy) else f"{len(result)}!={len(legacy)}"
+            print(f"{f'{years}y {label}':<28}{tvl_info['length']:>8}{legacy_time * 1e3:>12.2f}"
+                  f"{engine_time * 1e3:>12.2f}{legacy_time / max(engine_time, 1e-9):>9.1f}x{weeks:>8}")
+
+
+if __name__ == '__main__':
+    main()
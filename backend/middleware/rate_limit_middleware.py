@@ -1,52 +1,174 @@
 # Rate Limiting Middleware
 
+import math
+import os
 import time
+import sqlite3
 import logging
-from typing import Dict, Any, Optional
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, NamedTuple, Optional
 from flask import request, g
-from collections import defaultdict, deque
 from . import Middleware
 
 logger = logging.getLogger(__name__)
 
+
+class RateLimitDecision(NamedTuple):
+    allowed: bool
+    remaining: int
+    reset_at: float
+    retry_after: float
+
+
+class MemoryRateLimitStore:
+    """
+    Per-process GCRA state: one theoretical arrival time (TAT) per client.
+
+    A TAT in the past means the client's bucket is full again, which is the
+    same as having no entry, so idle keys are dropped as they are met at the
+    old end of the LRU order; max_keys bounds memory even when they are not.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def update(self, key: str, now: float, emission_interval: float, window: float) -> float:
+        """Applies one request to the key's TAT and returns the TAT before it (now if none)."""
+        with self._lock:
+            tat = max(self._tats.pop(key, now), now)
+            if tat + emission_interval - now <= window:
+                self._tats[key] = tat + emission_interval
+            else:
+                self._tats[key] = tat
+
+            while self._tats:
+                oldest_key, oldest_tat = next(iter(self._tats.items()))
+                if len(self._tats) > self.max_keys or oldest_tat <= now:
+                    self._tats.popitem(last=False)
+                else:
+                    break
+            return tat
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+
+class SqliteRateLimitStore:
+    """
+    GCRA state in a SQLite file shared by every gunicorn worker, so limits
+    hold across processes. Each update is one BEGIN IMMEDIATE transaction;
+    expired keys are purged every PURGE_EVERY updates.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS rate_limit (
+        key TEXT PRIMARY KEY,
+        tat REAL NOT NULL
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS rate_limit_tat ON rate_limit (tat);
+    """
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._updates = 0
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def update(self, key: str, now: float, emission_interval: float, window: float) -> float:
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute("SELECT tat FROM rate_limit WHERE key = ?", (key,)).fetchone()
+            tat = max(row[0], now) if row else now
+            if tat + emission_interval - now <= window:
+                conn.execute("INSERT OR REPLACE INTO rate_limit (key, tat) VALUES (?, ?)", (key, tat + emission_interval))
+            self._updates += 1
+            if self._updates % self.PURGE_EVERY == 0:
+                conn.execute("DELETE FROM rate_limit WHERE tat <= ?", (now,))
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        return tat
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM rate_limit").fetchone()[0]
+
+
+class GcraRateLimiter:
+    """
+    Generic cell rate algorithm: `max_requests` per `window_seconds`, with
+    bursts of up to `max_requests`. O(1) time and state per client.
+    """
+
+    def __init__(self, max_requests: int, window_seconds: float, store=None):
+        self.max_requests = max_requests
+        self.window_seconds = float(window_seconds)
+        self.emission_interval = self.window_seconds / max_requests
+        self.store = store if store is not None else MemoryRateLimitStore()
+
+    def hit(self, key: str, now: Optional[float] = None) -> RateLimitDecision:
+        now = time.time() if now is None else now
+        tat = self.store.update(key, now, self.emission_interval, self.window_seconds)
+        new_tat = tat + self.emission_interval
+        if new_tat - now > self.window_seconds:
+            return RateLimitDecision(False, 0, tat, new_tat - self.window_seconds - now)
+        remaining = int(math.floor((self.window_seconds - (new_tat - now)) / self.emission_interval + 1e-9))
+        return RateLimitDecision(True, remaining, new_tat, 0.0)
+
+
 class RateLimitMiddleware(Middleware):
-    """Simple rate limiting middleware"""
-    
-    def __init__(self, max_requests: int = 100, window_seconds: int = 60):
+    """
+    Rate limiting middleware (GCRA). State is per process by default; pass
+    `shared_db_path` (or set RATE_LIMIT_DB) to share limits between workers.
+    """
+
+    def __init__(self, max_requests: int = 100, window_seconds: int = 60,
+                 max_keys: int = 100_000, shared_db_path: Optional[str] = None):
         super().__init__()
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self.requests = defaultdict(deque)
-    
+        shared_db_path = shared_db_path or os.getenv('RATE_LIMIT_DB')
+        store = SqliteRateLimitStore(shared_db_path) if shared_db_path else MemoryRateLimitStore(max_keys)
+        self.limiter = GcraRateLimiter(max_requests, window_seconds, store)
+
     def before_request(self, *args, **kwargs) -> Optional[Dict[str, Any]]:
         """Check rate limit"""
         client_ip = request.remote_addr
-        current_time = time.time()
-        
-        # Clean old requests outside the window
-        while (self.requests[client_ip] and 
-               self.requests[client_ip][0] < current_time - self.window_seconds):
-            self.requests[client_ip].popleft()
-        
+        decision = self.limiter.hit(client_ip)
+
         # Check if limit exceeded
-        if len(self.requests[client_ip]) >= self.max_requests:
+        if not decision.allowed:
             logger.warning(f"Rate limit exceeded for {client_ip}")
             return {
                 'error': 'Rate Limit Exceeded',
                 'message': f'Maximum {self.max_requests} requests per {self.window_seconds} seconds',
                 'status_code': 429,
-                'retry_after': self.window_seconds
+                'retry_after': math.ceil(decision.retry_after)
             }
-        
-        # Add current request
-        self.requests[client_ip].append(current_time)
-        
+
         # Add rate limit info to response headers
-        g.rate_limit_remaining = self.max_requests - len(self.requests[client_ip])
-        g.rate_limit_reset = int(current_time + self.window_seconds)
-        
+        g.rate_limit_remaining = decision.remaining
+        g.rate_limit_reset = int(math.ceil(decision.reset_at))
+
         return None
-    
+
     def after_request(self, response, *args, **kwargs) -> Any:
         """Add rate limit headers to response"""
         if hasattr(g, 'rate_limit_remaining'):
@@ -54,7 +176,7 @@ class RateLimitMiddleware(Middleware):
             response.headers['X-RateLimit-Reset'] = str(g.rate_limit_reset)
             response.headers['X-RateLimit-Limit'] = str(self.max_requests)
         return response
-    
+
     def on_error(self, error: Exception, *args, **kwargs) -> Optional[Dict[str, Any]]:
         """Handle rate limiting errors"""
         logger.error(f"Rate limiting error: {str(error)}")
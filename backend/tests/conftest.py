@@ -0,0 +1,67 @@
+"""
+Shared fixtures: the Flask app on an in-memory SQLite database, with the
+local cache in a temporary directory and forum discussions stubbed out.
+
+    cd backend
+    python -m pytest tests
+"""
+import os
+import tempfile
+
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ.setdefault('GEMINI_API_KEY', 'test')
+os.environ.setdefault('PROPHET_CACHE_DB', os.path.join(tempfile.mkdtemp(), 'prophet_cache.sqlite3'))
+
+import pytest
+
+from app import create_app, services
+from app.db.models import db, Proposal, Proposer, Vote, Voter
+
+
+STATES = ['ACTIVE', 'EXECUTED', 'DEFEATED']
+
+
+def seed_proposals(proposals: int, votes_per_proposal: int = 5, proposers: int = 3) -> None:
+    """
+    Replaces the database contents with `proposals` proposals. Creation times
+    and turnouts repeat across proposals, and the first one has no creation
+    time, so every sort has ties that only the id breaks.
+    """
+    db.drop_all()
+    db.create_all()
+    for i in range(proposers):
+        db.session.add(Proposer(id=f'0xproposer{i}', delegated_votes_raw=10**20 + i))
+    for j in range(votes_per_proposal):
+        db.session.add(Voter(id=f'0xvoter{j}', delegated_votes_raw=(j + 1) * 10**21))
+    for i in range(proposals):
+        db.session.add(Proposal(
+            id=str(i), description=f'# Proposal {i}\nhttps://gov.uniswap.org/t/proposal-{i}/{i}',
+            proposer_id=f'0xproposer{i % proposers}', state=STATES[i % len(STATES)],
+            creation_time=None if i == 0 else 1_600_000_000 + (i // 2) * 100,
+            for_delegate_votes=(i % 4) * 10**15, against_delegate_votes=None if i % 5 == 0 else 5 * 10**15,
+            abstain_delegate_votes=10**15, quorum_votes=4 * 10**16,
+        ))
+        for j in range(votes_per_proposal):
+            db.session.add(Vote(id=f'{i}-{j}', voter_id=f'0xvoter{j}', proposal_id=str(i),
+                                weight=(j + 1) * 10**15, choice='FOR', reason=f'reason {j}'))
+    db.session.commit()
+
+
+@pytest.fixture
+def app(monkeypatch):
+    # Forum discussions come from the network or the forum mirror, not the app database.
+    monkeypatch.setattr(services, '_get_offchain_discussion', lambda *args: None)
+    app = create_app('development')
+    with app.app_context():
+        yield app
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def seed(app):
+    return seed_proposals
@@ -0,0 +1,60 @@
+"""
+/api/dao-metrics with the external sources stubbed: delegate concentration
+from the local voter table, its failure isolation and query cost.
+"""
+import pytest
+
+from app.db.models import db, Voter
+from app.db.query_counter import count_queries
+from app.utils.foundation_data import dao_metrics
+from app.utils.foundation_data.delegate_concentration import delegate_concentration_engine
+
+
+@pytest.fixture
+def stub_sources(app, monkeypatch):
+    def fetcher(fields):
+        return lambda: {field: 1.0 for field in fields}
+
+    monkeypatch.setattr(dao_metrics, 'SOURCES', {
+        source: (fetcher(fields), fields) for source, (_, fields) in dao_metrics.SOURCES.items()
+    })
+    monkeypatch.setattr(dao_metrics.DaoMetricsUtil, 'BACKGROUND_REFRESH', False)
+    monkeypatch.setattr(dao_metrics.DaoMetricsUtil, 'snapshot', dao_metrics.MetricsSnapshot(
+        {source: 3600 for source in dao_metrics.SOURCES}
+    ))
+    db.drop_all()
+    db.create_all()
+    db.session.add_all([Voter(id=f'0xvoter{i}', delegated_votes_raw=(i + 1) * 10**18) for i in range(10)])
+    db.session.commit()
+
+
+def test_concentration_is_served_with_the_other_metrics(client, stub_sources):
+    client.get('/api/dao-metrics')
+    body = client.get('/api/dao-metrics').get_json()
+    assert body['treasury']['total_usd'] == 1.0
+    assert body['delegate_concentration']['delegates'] == 10
+
+
+def test_concentration_version_is_read_once_per_request(client, stub_sources):
+    client.get('/api/dao-metrics')
+    with count_queries() as counter:
+        response = client.get('/api/dao-metrics')
+    assert response.status_code == 200
+    voter_queries = [statement for statement in counter.statements if 'FROM voter' in statement]
+    assert len(voter_queries) == 1
+
+
+def test_concentration_failure_is_isolated(client, stub_sources, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError('voter table unavailable')
+
+    monkeypatch.setattr(delegate_concentration_engine, 'get_data_version', fail)
+    monkeypatch.setattr(delegate_concentration_engine, 'get_concentration', fail)
+    client.get('/api/dao-metrics')
+    response = client.get('/api/dao-metrics')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['treasury']['total_usd'] == 1.0
+    assert body['delegate_concentration'] == {
+        'error': 'Error computing delegate concentration: voter table unavailable', 'status': 500
+    }
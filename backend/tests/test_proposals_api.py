@@ -0,0 +1,136 @@
+"""
+Behaviour of the proposal list endpoint: keyset pagination, sorts, filters
+and parameter validation.
+"""
+import json
+
+import pytest
+
+from app.db.models import db, Proposal
+from conftest import STATES
+
+
+def walk_pages(client, **params):
+    """Follows next_cursor from the first page to the last; returns the pages' proposal lists."""
+    pages = []
+    cursor = None
+    while True:
+        query = {**params, **({'cursor': cursor} if cursor else {})}
+        response = client.get('/api/proposals', query_string=query)
+        assert response.status_code == 200, response.get_json()
+        body = response.get_json()
+        pages.append(body['data'])
+        assert body['pagination']['has_next'] == (body['pagination']['next_cursor'] is not None)
+        cursor = body['pagination']['next_cursor']
+        if cursor is None:
+            return pages
+        assert len(pages) <= 1000, "pagination does not terminate"
+
+
+def export(client):
+    body = client.get('/api/proposals/export').get_data(as_text=True)
+    return [json.loads(line) for line in body.splitlines()]
+
+
+def all_proposals(client):
+    pages = walk_pages(client, per_page=100)
+    return [proposal for page in pages for proposal in page]
+
+
+def expected_order(proposals, sort):
+    if sort == 'newest':
+        return [p['id'] for p in sorted(proposals, key=lambda p: (p['creation_time'] or 0, p['id']), reverse=True)]
+    if sort == 'oldest':
+        return [p['id'] for p in sorted(proposals, key=lambda p: (p['creation_time'] or 0, p['id']))]
+    return [p['id'] for p in sorted(proposals, key=lambda p: (p['total_delegate_votes'], p['id']), reverse=True)]
+
+
+@pytest.mark.parametrize('per_page', [1, 7, 100])
+@pytest.mark.parametrize('sort', ['newest', 'oldest', 'turnout'])
+def test_pages_return_every_proposal_once_in_sort_order(client, seed, sort, per_page):
+    seed(45)
+    pages = walk_pages(client, sort=sort, per_page=per_page)
+
+    assert all(len(page) == per_page for page in pages[:-1])
+    assert 0 < len(pages[-1]) <= per_page
+    ids = [proposal['id'] for page in pages for proposal in page]
+    assert len(ids) == len(set(ids)) == 45
+    assert ids == expected_order(all_proposals(client), sort)
+
+
+def test_list_rows_omit_votes(client, seed):
+    seed(3)
+    proposal = client.get('/api/proposals').get_json()['data'][0]
+    assert 'votes' not in proposal
+    assert proposal['total_delegate_votes'] == (proposal['for_delegate_votes'] or 0) + \
+        (proposal['against_delegate_votes'] or 0) + (proposal['abstain_delegate_votes'] or 0)
+    assert proposal['proposer']['number_votes'] == 1
+
+
+def test_filters_apply_across_pages(client, seed):
+    seed(45)
+    everything = all_proposals(client)
+    created_after = 1_600_000_000 + 500
+    expected = [p['id'] for p in everything if p['state'] == STATES[0] and (p['creation_time'] or 0) >= created_after]
+
+    pages = walk_pages(client, per_page=4, state=STATES[0], created_after=created_after)
+    assert [proposal['id'] for page in pages for proposal in page] == expected
+
+
+def test_min_turnout_filter_pages_by_turnout(client, seed):
+    seed(45)
+    everything = all_proposals(client)
+    min_turnout = 6 * 10**15
+    expected = expected_order([p for p in everything if p['total_delegate_votes'] >= min_turnout], 'turnout')
+    assert 0 < len(expected) < len(everything)
+
+    pages = walk_pages(client, per_page=3, sort='turnout', min_turnout=min_turnout)
+    assert [proposal['id'] for page in pages for proposal in page] == expected
+
+
+def test_empty_result_has_no_cursor(client, seed):
+    seed(5)
+    body = client.get('/api/proposals', query_string={'state': 'QUEUED'}).get_json()
+    assert body['data'] == []
+    assert body['pagination'] == {'per_page': 20, 'next_cursor': None, 'has_next': False}
+
+
+def test_per_page_is_clamped(client, seed):
+    seed(5)
+    assert client.get('/api/proposals?per_page=1000').get_json()['pagination']['per_page'] == 100
+    assert client.get('/api/proposals?per_page=-3').get_json()['pagination']['per_page'] == 1
+
+
+@pytest.mark.parametrize('query', [
+    'cursor=not-a-cursor',
+    'cursor=bm90LWpzb24',
+    'sort=popular',
+    'per_page=ten',
+    'created_after=yesterday',
+    'min_turnout=lots',
+])
+def test_bad_parameters_are_rejected(client, seed, query):
+    seed(5)
+    response = client.get(f'/api/proposals?{query}')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_cursor_is_bound_to_its_sort(client, seed):
+    seed(5)
+    cursor = client.get('/api/proposals?per_page=2&sort=newest').get_json()['pagination']['next_cursor']
+    response = client.get('/api/proposals', query_string={'per_page': 2, 'sort': 'oldest', 'cursor': cursor})
+    assert response.status_code == 400
+
+
+def test_large_tallies_are_exact_integers(client, seed):
+    seed(3)
+    tally = 2**60  # above 2**53, yet exact in the REAL SQLite stores Numeric as
+    db.session.query(Proposal).filter(Proposal.id == '1').update({'for_delegate_votes': tally})
+    db.session.commit()
+
+    listed = {p['id']: p for p in client.get('/api/proposals').get_json()['data']}['1']
+    exported = {p['id']: p for p in export(client)}['1']
+    for proposal in (listed, exported):
+        assert proposal['for_delegate_votes'] == tally
+        assert isinstance(proposal['for_delegate_votes'], int)
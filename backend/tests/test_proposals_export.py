@@ -0,0 +1,71 @@
+"""
+Behaviour of /api/proposals/export: NDJSON and chunked JSON streams in list
+shape, oldest first, with the list filters applied.
+"""
+import json
+
+import pytest
+
+from app.services import EXPORT_BATCH_SIZE
+from conftest import STATES
+
+
+def export(client, **params):
+    response = client.get('/api/proposals/export', query_string=params)
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    if params.get('format') == 'json':
+        assert response.mimetype == 'application/json'
+        return json.loads(body)
+    assert response.mimetype == 'application/x-ndjson'
+    assert body == '' or body.endswith('\n')
+    return [json.loads(line) for line in body.splitlines()]
+
+
+def list_oldest_first(client, **params):
+    rows, cursor = [], None
+    while True:
+        query = {'per_page': 100, 'sort': 'oldest', **params, **({'cursor': cursor} if cursor else {})}
+        body = client.get('/api/proposals', query_string=query).get_json()
+        rows.extend(body['data'])
+        cursor = body['pagination']['next_cursor']
+        if cursor is None:
+            return rows
+
+
+@pytest.mark.parametrize('fmt', ['ndjson', 'json'])
+def test_export_matches_the_list_oldest_first(client, seed, fmt):
+    # More rows than one EXPORT_BATCH_SIZE fetch.
+    seed(EXPORT_BATCH_SIZE + 30, votes_per_proposal=0)
+    rows = export(client, format=fmt)
+    assert rows == list_oldest_first(client)
+    assert all('votes' not in row for row in rows)
+
+
+def test_ndjson_is_the_default_format(client, seed):
+    seed(3)
+    response = client.get('/api/proposals/export')
+    assert response.mimetype == 'application/x-ndjson'
+    assert len(response.get_data(as_text=True).splitlines()) == 3
+
+
+@pytest.mark.parametrize('fmt', ['ndjson', 'json'])
+def test_export_applies_filters(client, seed, fmt):
+    seed(40)
+    params = {'state': STATES[1], 'created_after': 1_600_000_000 + 500, 'min_turnout': 6 * 10**15}
+    rows = export(client, format=fmt, **params)
+    assert rows and rows == list_oldest_first(client, **params)
+
+
+@pytest.mark.parametrize('fmt', ['ndjson', 'json'])
+def test_empty_export(client, seed, fmt):
+    seed(3)
+    assert export(client, format=fmt, state='QUEUED') == []
+
+
+@pytest.mark.parametrize('query', ['format=csv', 'created_before=tomorrow', 'min_turnout=lots'])
+def test_bad_export_parameters_are_rejected(client, seed, query):
+    seed(3)
+    response = client.get(f'/api/proposals/export?{query}')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
@@ -0,0 +1,44 @@
+"""
+Query budgets for the proposal endpoints, against an in-memory SQLite
+database. The counts include the version queries run by conditional_get and
+must not grow with the number of proposals, votes or proposers.
+
+    cd backend
+    python -m pytest tests
+"""
+import pytest
+
+from app.db.query_counter import assert_max_queries
+
+
+LIST_QUERY_BUDGET = 3
+DETAIL_QUERY_BUDGET = 5
+NOT_MODIFIED_QUERY_BUDGET = 2
+
+
+@pytest.mark.parametrize('proposals', [5, 150])
+@pytest.mark.parametrize('per_page, sort', [(20, 'newest'), (100, 'newest'), (100, 'turnout')])
+def test_proposal_list_query_budget(client, seed, proposals, per_page, sort):
+    seed(proposals)
+    with assert_max_queries(LIST_QUERY_BUDGET):
+        response = client.get(f'/api/proposals?per_page={per_page}&sort={sort}')
+    assert response.status_code == 200
+    assert len(response.get_json()['data']) == min(proposals, per_page)
+
+
+@pytest.mark.parametrize('votes_per_proposal', [2, 40])
+def test_proposal_detail_query_budget(client, seed, votes_per_proposal):
+    seed(10, votes_per_proposal=votes_per_proposal)
+    with assert_max_queries(DETAIL_QUERY_BUDGET):
+        response = client.get('/api/proposals/4')
+    assert response.status_code == 200
+    assert len(response.get_json()['on_chain_data']['votes']) == votes_per_proposal
+
+
+@pytest.mark.parametrize('url', ['/api/proposals', '/api/proposals/4'])
+def test_not_modified_runs_only_version_queries(client, seed, url):
+    seed(10)
+    etag = client.get(url).headers['ETag']
+    with assert_max_queries(NOT_MODIFIED_QUERY_BUDGET):
+        response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 304
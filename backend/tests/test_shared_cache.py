@@ -0,0 +1,56 @@
+"""
+SharedCache single-flight refresh: lease renewal during slow refreshes and
+serving the previous value when a refresh fails.
+"""
+import threading
+import time
+
+import pytest
+
+from app.utils.local_store import LocalStore
+from app.utils.shared_cache import SharedCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SharedCache(LocalStore(str(tmp_path / 'cache.sqlite3')))
+
+
+def test_lease_is_renewed_while_a_refresh_outlives_it(cache):
+    runs = []
+
+    def slow_refresh():
+        runs.append(1)
+        time.sleep(0.6)
+        return len(runs)
+
+    first = threading.Thread(target=cache.get_or_refresh, args=('key', 60, slow_refresh), kwargs={'lease_seconds': 0.15})
+    first.start()
+    time.sleep(0.3)
+    # The lease period has passed twice over, but the holder keeps renewing it.
+    assert cache.get_or_refresh('key', 60, slow_refresh, lease_seconds=0.15) == 1
+    first.join()
+    assert len(runs) == 1
+
+
+def test_failed_refresh_serves_the_previous_value_and_backs_off(cache):
+    cache.set('key', {'value': 1})
+    attempts = []
+
+    def failing_refresh():
+        attempts.append(1)
+        raise RuntimeError('upstream down')
+
+    assert cache.get_or_refresh('key', 0, failing_refresh) == {'value': 1}
+    assert cache.get_or_refresh('key', 0, failing_refresh) == {'value': 1}
+    assert len(attempts) == 1
+
+
+def test_failed_refresh_without_a_previous_value_raises(cache):
+    def failing_refresh():
+        raise RuntimeError('upstream down')
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_refresh('key', 60, failing_refresh)
+    # The lease was released, so the next caller refreshes right away.
+    assert cache.get_or_refresh('key', 60, lambda: 2) == 2
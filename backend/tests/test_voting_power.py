@@ -0,0 +1,82 @@
+"""
+Block-indexed voting power aggregate and /api/dao-metrics/voting-power,
+against a stubbed subgraph.
+"""
+import json
+import re
+
+import pytest
+
+from app.utils.foundation_data import dao_metrics
+from app.utils.foundation_data.voting_power import SubgraphService, VotingPowerAggregate
+from app.utils.local_store import LocalStore
+
+
+class FakeSubgraph:
+    """Answers the service's queries from a head block and the delegates changed at each block."""
+
+    def __init__(self):
+        self.head = 0
+        self.balances = {}
+        self.changed_at = {}
+        self.delegate_queries = []
+
+    def set_block(self, head, balances):
+        self.head = head
+        for delegate, balance in balances.items():
+            self.balances[delegate] = balance
+            self.changed_at[delegate] = head
+
+    def execute(self, query):
+        if '_meta' in query:
+            return {'data': {'_meta': {'block': {'number': self.head}}}}
+        if '__schema' in query:
+            return {'data': {'__schema': {'queryType': {'fields': [{'name': 'delegates'}]}}}}
+        self.delegate_queries.append(query)
+        changed_since = re.search(r'_change_block: \{number_gte: (\d+)\}', query)
+        after = re.search(r'id_gt: ("[^"]*")', query)
+        rows = [
+            {'id': delegate, 'delegatedVotes': str(balance)}
+            for delegate, balance in sorted(self.balances.items())
+            if (not changed_since or self.changed_at[delegate] >= int(changed_since.group(1)))
+            and (not after or delegate > json.loads(after.group(1)))
+        ]
+        return {'data': {'delegates': rows}}
+
+
+@pytest.fixture
+def subgraph(app, tmp_path, monkeypatch):
+    monkeypatch.setenv('SUBGRAPH_ID', 'test')
+    monkeypatch.setenv('THEGRAPH_JWT_TOKEN', 'test')
+    fake = FakeSubgraph()
+    service = SubgraphService(VotingPowerAggregate(LocalStore(str(tmp_path / 'cache.sqlite3'))))
+    service.SCAN_PARTITIONS = 1
+    monkeypatch.setattr(service, '_execute_query', fake.execute)
+    monkeypatch.setattr(dao_metrics, 'subgraph_service', service)
+    return fake
+
+
+def test_refresh_only_reads_changed_delegates(client, subgraph):
+    subgraph.set_block(100, {'0xa': 5, '0xb': 3})
+    assert client.get('/api/dao-metrics/voting-power').get_json() == {'totalDelegatedVotingPower': 8.0, 'block': 100}
+
+    subgraph.set_block(200, {'0xa': 10})
+    subgraph.delegate_queries.clear()
+    assert client.get('/api/dao-metrics/voting-power').get_json() == {'totalDelegatedVotingPower': 13.0, 'block': 200}
+    assert all('_change_block: {number_gte: 101}' in query for query in subgraph.delegate_queries)
+
+
+def test_historical_totals_by_block(client, subgraph):
+    subgraph.set_block(100, {'0xa': 5, '0xb': 3})
+    client.get('/api/dao-metrics/voting-power')
+    subgraph.set_block(200, {'0xb': 0})
+    client.get('/api/dao-metrics/voting-power')
+
+    assert client.get('/api/dao-metrics/voting-power?block=150').get_json() == {'totalDelegatedVotingPower': 8.0, 'block': 100}
+    assert client.get('/api/dao-metrics/voting-power?block=200').get_json() == {'totalDelegatedVotingPower': 5.0, 'block': 200}
+    assert client.get('/api/dao-metrics/voting-power?block=99').status_code == 404
+
+
+@pytest.mark.parametrize('block', ['latest', '-1'])
+def test_bad_block_is_rejected(client, subgraph, block):
+    assert client.get(f'/api/dao-metrics/voting-power?block={block}').status_code == 400
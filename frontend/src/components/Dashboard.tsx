@@ -425,7 +425,7 @@ export const Dashboard = ({ onSectionChange }: DashboardProps) => {
                               </svg>
                             </div>
                             <h4 className="text-white font-semibold">{extractTitle(proposal.description)}</h4>
-                            <span className="text-gray-400 text-sm">{formatVotes(proposal.votes.reduce((acc, vote) => acc + vote.weight!, 0).toString())} votes</span>
+                            <span className="text-gray-400 text-sm">{formatVotes((proposal.total_delegate_votes ?? 0).toString())} votes</span>
                           </div>
                           <div className={`px-3 py-1 rounded-full text-xs font-semibold ${
                             proposal.state === 'Active' ? 'text-white' :
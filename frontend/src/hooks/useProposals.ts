@@ -1,25 +1,32 @@
 // hooks/useProposals.ts
-import { useQuery } from '@tanstack/react-query';
-import { proposalAPI, type Proposal } from '../services/api';
+import { useInfiniteQuery } from '@tanstack/react-query';
+import { proposalAPI, DEFAULT_PROPOSALS_PER_PAGE, type ProposalPage } from '../services/api';
 // Import your mock data as the fallback
 import { mockProposals } from '../const';
 
-export const useProposals = () => {
+export const useProposals = (perPage: number = DEFAULT_PROPOSALS_PER_PAGE) => {
   const {
-    data: apiData, // Rename data to avoid shadowing
+    data,
     isLoading,
     isError,
-  } = useQuery<Proposal[], Error>({
-    queryKey: ['proposals'],
-    queryFn: proposalAPI.getAllProposals,
+    hasNextPage,
+    isFetchingNextPage,
+    fetchNextPage,
+  } = useInfiniteQuery<ProposalPage, Error>({
+    queryKey: ['proposals', perPage],
+    // Only the first page is fetched up front; further pages load on demand via next_cursor.
+    queryFn: ({ pageParam }) => proposalAPI.getProposalsPage(pageParam as string | null, perPage),
+    initialPageParam: null,
+    getNextPageParam: (lastPage) => lastPage.pagination.next_cursor ?? undefined,
     retry: 0, // Optional: retry once on failure
   });
 
   // If the query is in an error state, use the mock data.
-  // Otherwise, use the API data (or an empty array while loading).
-  const allProposals = isError ? mockProposals : apiData || [];
+  // Otherwise, use the pages loaded so far (or an empty array while loading).
+  const allProposals = isError ? mockProposals : data?.pages.flatMap(page => page.data) ?? [];
 
   // Derive the active proposal from whichever data source is being used.
+  // The list is newest first, so active proposals arrive with the first page.
   const activeProposal = allProposals.find(p => p.state === 'ACTIVE') || null;
 
   // Return a consistent shape. The component consuming this hook
@@ -31,5 +38,8 @@ export const useProposals = () => {
     // You can still return isError if you want to conditionally show a message
     // in the UI (e.g., "Displaying cached data due to a network error").
     isError,
+    hasMore: !isError && hasNextPage,
+    loadingMore: isFetchingNextPage,
+    loadMore: () => fetchNextPage(),
   };
-};
\ No newline at end of file
+};
@@ -17,7 +17,7 @@ interface ProposalsPageProps {
 
 export const ProposalsPage = ({ onSectionChange }: ProposalsPageProps) => {
   const proposalsRef = useRef<HTMLDivElement>(null)
-  const { allProposals, activeProposal, loading, isError } = useProposals()
+  const { allProposals, activeProposal, loading, isError, hasMore, loadingMore, loadMore } = useProposals()
   const [searchTerm, setSearchTerm] = useState('')
   const [selectedProposal, setSelectedProposal] = useState<Proposal | null>(null) // Changed to Proposal type
   
@@ -201,6 +201,9 @@ export const ProposalsPage = ({ onSectionChange }: ProposalsPageProps) => {
                       allProposals={allProposals}
                       loading={loading}
                       isError={isError}
+                      hasMore={hasMore}
+                      loadingMore={loadingMore}
+                      onLoadMore={loadMore}
                     />
                   </div>
                 )}
@@ -24,9 +24,12 @@ interface AllProposalsProps {
   allProposals: BackendProposal[]
   loading: boolean
   isError: boolean
+  hasMore?: boolean
+  loadingMore?: boolean
+  onLoadMore?: () => void
 }
 
-export const AllProposals = ({ searchTerm, allProposals, loading, isError }: AllProposalsProps) => {
+export const AllProposals = ({ searchTerm, allProposals, loading, isError, hasMore = false, loadingMore = false, onLoadMore }: AllProposalsProps) => {
   const [sortBy, setSortBy] = useState<SortOption>('newest')
   const [filterBy, setFilterBy] = useState<FilterOption>('all')
   const [selectedProposal, setSelectedProposal] = useState<BackendProposal | null>(null)
@@ -267,6 +270,19 @@ export const AllProposals = ({ searchTerm, allProposals, loading, isError }: All
         </div>
       )}
 
+      {hasMore && onLoadMore && (
+        <div className="flex justify-center mt-6">
+          <button
+            onClick={onLoadMore}
+            disabled={loadingMore}
+            className="px-4 py-2 rounded-xl text-sm font-semibold transition-colors disabled:opacity-50"
+            style={{ backgroundColor: 'rgba(199, 125, 255, 0.2)', color: '#c77dff' }}
+          >
+            {loadingMore ? 'Loading...' : 'Load More'}
+          </button>
+        </div>
+      )}
+
       {selectedProposal && (
         <ProposalDetails
           proposal={selectedProposal}
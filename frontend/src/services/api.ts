@@ -2,6 +2,8 @@ import axios from 'axios';
 
 const API_BASE_URL = 'http://localhost:5000';
 
+export const DEFAULT_PROPOSALS_PER_PAGE = 20;
+
 export interface Proposer {
   id: string;
   delegated_votes_raw: number | null;
@@ -24,7 +26,8 @@ export interface Proposal {
   //
   proposer: Proposer;
   state: string;
-  votes: Vote[];
+  // Only present on the detail endpoint; list pages omit individual votes
+  votes?: Vote[];
   // Backend field names
   abstain_delegate_votes?: number | null;
   against_delegate_votes?: number | null;
@@ -32,6 +35,15 @@ export interface Proposal {
   total_delegate_votes?: number | null;
 }
 
+export interface ProposalPage {
+  data: Proposal[];
+  pagination: {
+    per_page: number;
+    next_cursor: string | null;
+    has_next: boolean;
+  };
+}
+
 export interface AIRecommendation {
   recommendation: string;
   rationale: string;
@@ -60,13 +72,16 @@ export interface APIResponse<T> {
 
 class ProposalAPI {
 
-  async getAllProposals(): Promise<Proposal[]> {
+  // One keyset page of the proposal list; pass the previous page's next_cursor to continue
+  async getProposalsPage(cursor: string | null = null, perPage: number = DEFAULT_PROPOSALS_PER_PAGE): Promise<ProposalPage> {
     try {
-      const response = await axios.get(`${API_BASE_URL}/api/proposals`, { timeout: 300000 }); // 5 minutes
-      console.log('All proposals response:', response.data);
+      const params: Record<string, string | number> = { per_page: perPage };
+      if (cursor) params.cursor = cursor;
+      const response = await axios.get<ProposalPage>(`${API_BASE_URL}/api/proposals`, { params, timeout: 300000 }); // 5 minutes
+      console.log('Proposals page response:', response.data);
       return response.data;
     } catch (error) {
-      console.error('Error fetching all proposals:', error);
+      console.error('Error fetching proposals page:', error);
       throw error;
     }
   }
@@ -32,4 +32,14 @@ CREATE TABLE IF NOT EXISTS proposer (
 CREATE TABLE IF NOT EXISTS voter (
     id VARCHAR(42) PRIMARY KEY,
     delegated_votes_raw NUMERIC
-);
\ No newline at end of file
+);
+
+-- Indexes backing the API's keyset pagination and SQL-side sorts. The
+-- expressions must match the ones emitted by the backend's hybrid properties.
+CREATE INDEX IF NOT EXISTS proposal_creation_time_idx
+    ON proposal ((COALESCE(creation_time, 0)), id);
+
+CREATE INDEX IF NOT EXISTS proposal_turnout_idx
+    ON proposal ((COALESCE(for_delegate_votes, 0) + COALESCE(against_delegate_votes, 0) + COALESCE(abstain_delegate_votes, 0)), id);
+
+CREATE INDEX IF NOT EXISTS proposal_proposer_idx ON proposal (proposer);